@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+"""
+Load-generation benchmark for socks5_proxy.py
+Starts SOCKS5Server on localhost next to a local echo/sink/source target,
+drives concurrent SOCKS5 clients and prints the results as JSON
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import socket
+import struct
+import subprocess
+import sys
+import time
+
+BENCH_USER = 'bench'
+BENCH_PASS = 'bench'
+READ_SIZE = 262144
+
+# Target protocol: the first byte picks the behaviour
+MODE_ECHO = b'E'  # Echo everything back
+MODE_SINK = b'D'  # Followed by an 8-byte count: discard that many bytes, then reply with it
+MODE_SOURCE = b'S'  # Followed by an 8-byte count: send that many bytes, then close
+
+
+class BenchError(Exception):
+    pass
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def percentiles(samples):
+    """p50/p90/p99/max of a list of seconds, in milliseconds"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))] * 1000, 3)
+    return {'p50': pick(0.5), 'p90': pick(0.9), 'p99': pick(0.99), 'max': pick(1.0)}
+
+
+# ---------------------------------------------------------------------------
+# Server side: proxy and target run in their own processes so their CPU and
+# memory can be measured separately from the load generator
+# ---------------------------------------------------------------------------
+
+def serve_proxy(log_level):
+    """Entry point of the proxy child process (configured through SOCKS5_* env vars)"""
+    import logging
+    import socks5_proxy
+    logging.getLogger().setLevel(log_level)
+    proxy = socks5_proxy.SOCKS5Server(
+        socks5_proxy.PROXY_HOST, socks5_proxy.PROXY_PORT,
+        socks5_proxy.PROXY_USER, socks5_proxy.PROXY_PASS,
+        socks5_proxy.MAX_CONNECTIONS, socks5_proxy.ENGINE,
+        socks5_proxy.RELAY_MODE, socks5_proxy.WORKERS,
+    )
+    proxy.serve()
+
+
+async def _target_client(reader, writer):
+    try:
+        mode = await reader.readexactly(1)
+        if mode == MODE_ECHO:
+            while True:
+                data = await reader.read(READ_SIZE)
+                if not data:
+                    break
+                writer.write(data)
+                await writer.drain()
+        elif mode == MODE_SINK:
+            # Counted rather than read-to-EOF: the proxy tears down both directions on EOF
+            expected = struct.unpack('!Q', await reader.readexactly(8))[0]
+            total = 0
+            while total < expected:
+                data = await reader.read(READ_SIZE)
+                if not data:
+                    break
+                total += len(data)
+            writer.write(struct.pack('!Q', total))
+            await writer.drain()
+        elif mode == MODE_SOURCE:
+            remaining = struct.unpack('!Q', await reader.readexactly(8))[0]
+            block = b'\0' * READ_SIZE
+            while remaining:
+                n = min(remaining, READ_SIZE)
+                writer.write(block[:n])
+                await writer.drain()
+                remaining -= n
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+class _UDPEcho(asyncio.DatagramProtocol):
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.transport.sendto(data, addr)
+
+
+def serve_target(port):
+    """Entry point of the target child process (TCP target plus a UDP echo on the same port)"""
+    async def main():
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(_UDPEcho, local_addr=('127.0.0.1', port))
+        server = await asyncio.start_server(_target_client, '127.0.0.1', port, backlog=1024)
+        async with server:
+            await server.serve_forever()
+    asyncio.run(main())
+
+
+def wait_for_port(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise BenchError(f"nothing listening on port {port} after {timeout}s")
+
+
+def process_tree(pid):
+    """pid plus its children (worker processes)"""
+    try:
+        import psutil
+        proc = psutil.Process(pid)
+        return [pid] + [child.pid for child in proc.children(recursive=True)]
+    except ImportError:
+        pass
+    except Exception:
+        return [pid]
+    pids = [pid]
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            pids += [int(child) for child in f.read().split()]
+    except OSError:
+        pass
+    return pids
+
+
+def cpu_seconds(pid):
+    """User + system CPU time of the proxy (and its workers) from /proc"""
+    ticks = os.sysconf('SC_CLK_TCK')
+    total = 0
+    for p in process_tree(pid):
+        try:
+            with open(f'/proc/{p}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            total += int(fields[11]) + int(fields[12])  # utime, stime
+        except (OSError, IndexError, ValueError):
+            pass
+    return total / ticks
+
+
+def rss_bytes(pid):
+    total = 0
+    for p in process_tree(pid):
+        try:
+            with open(f'/proc/{p}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            pass
+    return total
+
+
+# ---------------------------------------------------------------------------
+# Client side
+# ---------------------------------------------------------------------------
+
+async def open_tunnel(proxy_port, target_port, cmd=1):
+    """SOCKS5 handshake (lock-step, like a normal client) to the local target
+
+    For cmd=3 (UDP ASSOCIATE) the relay address is returned instead of the
+    reader, with the writer kept as the control connection.
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', proxy_port)
+    try:
+        writer.write(b'\x05\x01\x02')
+        if await reader.readexactly(2) != b'\x05\x02':
+            raise BenchError("proxy refused username/password auth")
+        user, password = BENCH_USER.encode(), BENCH_PASS.encode()
+        writer.write(b'\x01' + bytes([len(user)]) + user + bytes([len(password)]) + password)
+        if await reader.readexactly(2) != b'\x01\x00':
+            raise BenchError("authentication failed")
+        port = target_port if cmd == 1 else 0
+        writer.write(bytes([5, cmd, 0, 1]) + socket.inet_aton('127.0.0.1') + struct.pack('!H', port))
+        reply = await reader.readexactly(4)
+        if reply[1] != 0:
+            raise BenchError(f"command {cmd} failed with reply {reply[1]}")
+        bound = await reader.readexactly(6 if reply[3] == 1 else 18)
+    except BaseException:
+        writer.close()
+        raise
+    if cmd == 3:
+        family = socket.AF_INET if reply[3] == 1 else socket.AF_INET6
+        return (socket.inet_ntop(family, bound[:-2]), struct.unpack('!H', bound[-2:])[0]), writer
+    return reader, writer
+
+
+async def bench_handshakes(args, proxy_port, target_port):
+    """Open, handshake and close tunnels back to back for args.duration seconds"""
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + args.duration
+
+    async def client():
+        nonlocal errors
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            try:
+                reader, writer = await open_tunnel(proxy_port, target_port)
+            except (OSError, BenchError, asyncio.IncompleteReadError):
+                errors += 1
+                continue
+            latencies.append(time.monotonic() - started)
+            writer.close()
+
+    started = time.monotonic()
+    await asyncio.gather(*(client() for _ in range(args.concurrency)))
+    elapsed = time.monotonic() - started
+    return {
+        'handshakes': len(latencies),
+        'errors': errors,
+        'handshakes_per_sec': round(len(latencies) / elapsed, 1),
+        'connect_latency_ms': percentiles(latencies),
+    }
+
+
+async def bench_throughput(args, proxy_port, target_port, proxy_pid):
+    """Bulk upload to the sink and download from the source, args.size bytes per tunnel"""
+    results = {}
+    for direction in ('download', 'upload'):
+        payload = b'\0' * READ_SIZE
+
+        async def client():
+            reader, writer = await open_tunnel(proxy_port, target_port)
+            try:
+                if direction == 'download':
+                    writer.write(MODE_SOURCE + struct.pack('!Q', args.size))
+                    received = 0
+                    while True:
+                        data = await reader.read(READ_SIZE)
+                        if not data:
+                            break
+                        received += len(data)
+                    return received
+                writer.write(MODE_SINK + struct.pack('!Q', args.size))
+                remaining = args.size
+                while remaining:
+                    n = min(remaining, READ_SIZE)
+                    writer.write(payload[:n])
+                    await writer.drain()
+                    remaining -= n
+                return struct.unpack('!Q', await reader.readexactly(8))[0]
+            finally:
+                writer.close()
+
+        cpu_before = cpu_seconds(proxy_pid)
+        started = time.monotonic()
+        moved = await asyncio.gather(*(client() for _ in range(args.streams)), return_exceptions=True)
+        elapsed = time.monotonic() - started
+        cpu = cpu_seconds(proxy_pid) - cpu_before
+        relayed = sum(n for n in moved if isinstance(n, int))
+        results[direction] = {
+            'streams': args.streams,
+            'bytes': relayed,
+            'errors': sum(1 for n in moved if not isinstance(n, int)),
+            'seconds': round(elapsed, 3),
+            'mb_per_sec': round(relayed / elapsed / 1e6, 2),
+            'proxy_cpu_seconds': round(cpu, 3),
+            'proxy_cpu_seconds_per_gb': round(cpu / relayed * 1e9, 3) if relayed else None,
+        }
+    return results
+
+
+class _UDPClient(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.received = 0
+        self.event = asyncio.Event()
+
+    def datagram_received(self, data, addr):
+        self.received += 1
+        self.event.set()
+
+
+async def bench_udp(args, proxy_port, target_port, proxy_pid):
+    """Small-datagram round trips through UDP associations, WINDOW datagrams in flight each"""
+    loop = asyncio.get_running_loop()
+    window = 32
+    header = b'\x00\x00\x00\x01' + socket.inet_aton('127.0.0.1') + struct.pack('!H', target_port)
+    datagram = header + b'\0' * args.datagram
+
+    async def association():
+        relay, control = await open_tunnel(proxy_port, target_port, cmd=3)
+        transport, protocol = await loop.create_datagram_endpoint(_UDPClient, remote_addr=relay)
+        sent = 0
+        try:
+            while time.monotonic() < deadline:
+                # Keep the window full; anything missing after a quiet 200 ms counts as lost
+                for _ in range(window - (sent - protocol.received)):
+                    transport.sendto(datagram)
+                    sent += 1
+                protocol.event.clear()
+                try:
+                    await asyncio.wait_for(protocol.event.wait(), 0.2)
+                except asyncio.TimeoutError:
+                    sent = protocol.received
+            return protocol.received
+        finally:
+            transport.close()
+            control.close()
+
+    cpu_before = cpu_seconds(proxy_pid)
+    started = time.monotonic()
+    deadline = started + args.duration
+    received = await asyncio.gather(*(association() for _ in range(args.udp_associations)),
+                                    return_exceptions=True)
+    elapsed = time.monotonic() - started
+    cpu = cpu_seconds(proxy_pid) - cpu_before
+    packets = sum(n for n in received if isinstance(n, int))
+    return {
+        'associations': args.udp_associations,
+        'errors': sum(1 for n in received if not isinstance(n, int)),
+        'datagram_bytes': args.datagram,
+        'round_trips': packets,
+        'round_trips_per_sec': round(packets / elapsed, 1),
+        'proxy_cpu_seconds': round(cpu, 3),
+        'proxy_cpu_us_per_datagram': round(cpu / (packets * 2) * 1e6, 2) if packets else None,
+    }
+
+
+async def _keep_echoing(reader, writer, deadline):
+    block = b'\0' * 16384
+    while time.monotonic() < deadline:
+        writer.write(block)
+        await reader.readexactly(len(block))
+
+
+async def bench_memory(args, proxy_port, target_port, proxy_pid):
+    """Proxy RSS growth per established tunnel, idle and then with all of them echoing at once"""
+    await asyncio.sleep(0.5)
+    baseline = rss_bytes(proxy_pid)
+    tunnels = []
+    try:
+        for _ in range(args.idle):
+            reader, writer = await open_tunnel(proxy_port, target_port)
+            tunnels.append((reader, writer))
+            writer.write(MODE_ECHO + b'x')
+            await reader.readexactly(1)  # Tunnel is fully established both ways
+        await asyncio.sleep(0.5)
+        idle = rss_bytes(proxy_pid)
+        deadline = time.monotonic() + args.active_seconds
+        load = asyncio.gather(*(_keep_echoing(reader, writer, deadline) for reader, writer in tunnels))
+        active = idle
+        while not load.done():
+            await asyncio.wait([load], timeout=0.1)
+            active = max(active, rss_bytes(proxy_pid))
+        load.result()
+    finally:
+        for _, writer in tunnels:
+            writer.close()
+    count = max(len(tunnels), 1)
+    per_idle, per_active = (idle - baseline) // count, (active - baseline) // count
+    return {
+        'tunnels': len(tunnels),
+        'rss_baseline_kb': baseline // 1024,
+        'rss_idle_kb': idle // 1024,
+        'rss_active_kb': active // 1024,
+        'bytes_per_idle_tunnel': per_idle,
+        'bytes_per_active_tunnel': per_active,
+        'budget': {
+            'idle': args.idle_budget or None,
+            'active': args.active_budget or None,
+            'within': (not args.idle_budget or per_idle <= args.idle_budget) and
+                      (not args.active_budget or per_active <= args.active_budget),
+        },
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--engine', default='threads', choices=('threads', 'asyncio'))
+    parser.add_argument('--relay', default='auto', choices=('auto', 'splice', 'copy'))
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--concurrency', type=int, default=50, help="clients in the handshake test")
+    parser.add_argument('--duration', type=float, default=5, help="seconds of the handshake and UDP tests")
+    parser.add_argument('--streams', type=int, default=4, help="parallel tunnels in the throughput test")
+    parser.add_argument('--size', default='64M', help="bytes per tunnel and direction (K/M/G suffix)")
+    parser.add_argument('--idle', type=int, default=200, help="tunnels held open in the memory test")
+    parser.add_argument('--active-seconds', type=float, default=2, help="seconds all tunnels echo in the memory test")
+    parser.add_argument('--idle-budget', default='32K', help="max proxy RSS per idle tunnel, 0 for none (K/M suffix)")
+    parser.add_argument('--active-budget', default='128K', help="max proxy RSS per active tunnel, 0 for none")
+    parser.add_argument('--udp-associations', type=int, default=8, help="associations in the UDP test")
+    parser.add_argument('--datagram', type=int, default=64, help="payload bytes per datagram in the UDP test")
+    parser.add_argument('--tests', default='handshake,throughput,udp,memory')
+    parser.add_argument('--log-level', default='WARNING', help="proxy log level during the run")
+    parser.add_argument('--output', help="write JSON here instead of stdout")
+    parser.add_argument('--serve-proxy', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_proxy:
+        serve_proxy(args.log_level)
+        return
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from socks5_proxy import parse_size
+    args.size = parse_size(args.size)
+    args.idle_budget = parse_size(args.idle_budget)
+    args.active_budget = parse_size(args.active_budget)
+    tests = [t.strip() for t in args.tests.split(',') if t.strip()]
+    tests.sort(key=lambda test: test != 'memory')  # Before the others leave freed heap behind that hides growth
+
+    proxy_port, target_port = free_port(), free_port()
+    max_connections = max(args.concurrency, args.streams, args.idle) * 2 + 10
+    env = dict(os.environ,
+               SOCKS5_HOST='127.0.0.1', SOCKS5_PORT=str(proxy_port),
+               SOCKS5_USER=BENCH_USER, SOCKS5_PASS=BENCH_PASS,
+               SOCKS5_MAX_CONN=str(max_connections), SOCKS5_ENGINE=args.engine,
+               SOCKS5_RELAY=args.relay, SOCKS5_WORKERS=str(args.workers))
+
+    target = multiprocessing.Process(target=serve_target, args=(target_port,), daemon=True)
+    target.start()
+    proxy = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve-proxy',
+                              '--log-level', args.log_level], env=env)
+    results = {}
+    try:
+        wait_for_port(target_port)
+        wait_for_port(proxy_port)
+        for test in tests:
+            print(f"Running {test}...", file=sys.stderr)
+            if test == 'handshake':
+                results[test] = asyncio.run(bench_handshakes(args, proxy_port, target_port))
+            elif test == 'throughput':
+                results[test] = asyncio.run(bench_throughput(args, proxy_port, target_port, proxy.pid))
+            elif test == 'udp':
+                results[test] = asyncio.run(bench_udp(args, proxy_port, target_port, proxy.pid))
+            elif test == 'memory':
+                results[test] = asyncio.run(bench_memory(args, proxy_port, target_port, proxy.pid))
+            else:
+                raise BenchError(f"unknown test '{test}'")
+    finally:
+        proxy.terminate()
+        try:
+            proxy.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proxy.kill()
+        target.terminate()
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'config': {
+            'engine': args.engine, 'relay': args.relay, 'workers': args.workers,
+            'concurrency': args.concurrency, 'duration': args.duration,
+            'streams': args.streams, 'size': args.size, 'idle': args.idle, 'active_seconds': args.active_seconds,
+            'idle_budget': args.idle_budget, 'active_budget': args.active_budget,
+            'udp_associations': args.udp_associations, 'datagram': args.datagram,
+        },
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    memory = results.get('memory')
+    if memory and not memory['budget']['within']:
+        print(f"Over the memory budget: {memory['bytes_per_idle_tunnel']} bytes per idle tunnel "
+              f"(max {args.idle_budget or '-'}), {memory['bytes_per_active_tunnel']} per active tunnel "
+              f"(max {args.active_budget or '-'})", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from socks5_proxy import AccessLog, _parse_time, access_log_main
+
+
+class AccessLogTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'access.log')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, entries, capacity=8):
+        log = AccessLog(self.path, capacity)
+        for started, client, host, up in entries:
+            log.record(started, 1.5, client, 'alice', 1, host, 443, up, up * 10, 0)
+        log.close()
+
+    def test_records_round_trip(self):
+        self.write([(1000.0, '192.0.2.1', 'example.com', 10), (1001.0, '2001:db8::1', 'example.org', 20)])
+        first, second = AccessLog.read(self.path)
+        self.assertEqual(first, {'time': 1000.0, 'duration': 1.5, 'client': '192.0.2.1', 'user': 'alice',
+                                 'command': 'connect', 'host': 'example.com', 'port': 443,
+                                 'bytes_up': 10, 'bytes_down': 100, 'result': 0})
+        self.assertEqual(second['client'], '2001:db8::1')
+
+    def test_the_ring_keeps_the_newest_records_in_order(self):
+        self.write([(1000.0 + i, '192.0.2.1', f'h{i}.example', i) for i in range(20)], capacity=8)
+        self.assertEqual([r['bytes_up'] for r in AccessLog.read(self.path, chunk=3)], list(range(12, 20)))
+        log = AccessLog(self.path, 8)  # Reopening keeps the records
+        log.record(2000.0, 0, '192.0.2.1', None, 3, 'late.example', 53, 0, 0, 0)
+        log.close()
+        last = list(AccessLog.read(self.path))[-1]
+        self.assertEqual((last['user'], last['command']), ('', 'udp'))
+
+    def test_another_size_starts_over(self):
+        self.write([(1000.0, '192.0.2.1', 'example.com', 10)], capacity=8)
+        self.write([], capacity=16)
+        self.assertEqual(list(AccessLog.read(self.path)), [])
+        with open(os.path.join(self.directory.name, 'junk'), 'wb') as f:
+            f.write(b'x' * 256)
+        with self.assertRaises(ValueError):
+            list(AccessLog.read(f.name))
+
+    def test_filters_and_top(self):
+        self.write([(1000.0, '192.168.1.5', 'www.example.com', 10), (1001.0, '192.168.2.5', 'example.com', 20),
+                    (1002.0, '10.0.0.1', 'notexample.com', 30), (1003.0, '192.168.1.6', 'example.org', 40)])
+        read = lambda **filters: [r['bytes_up'] for r in AccessLog.read(self.path, **filters)]
+        self.assertEqual(read(since=1001.0, until=1003.0), [20, 30])
+        self.assertEqual(read(client='192.168.1.0/24'), [10, 40])
+        self.assertEqual(read(host='Example.com.'), [10, 20])
+        top = AccessLog.top(AccessLog.read(self.path), 'host', limit=2)
+        self.assertEqual(top, [('example.org', 1, 40, 400), ('notexample.com', 1, 30, 300)])
+
+    def test_query_tool(self):
+        self.write([(1000.0 + i, '192.0.2.1', 'example.com', i) for i in range(5)])
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            self.assertEqual(access_log_main(['--file', self.path, '--json', '--limit', '2']), 0)
+        self.assertEqual([json.loads(line)['bytes_up'] for line in out.getvalue().splitlines()], [3, 4])
+        err = io.StringIO()
+        with contextlib.redirect_stderr(err):
+            self.assertEqual(access_log_main(['--file', os.path.join(self.directory.name, 'missing')]), 1)
+        self.assertIn('access-log:', err.getvalue())
+
+    def test_parse_time(self):
+        with mock.patch('time.time', return_value=100000.0):
+            self.assertEqual(_parse_time('90m'), 100000.0 - 5400)
+            self.assertEqual(_parse_time('2d'), 100000.0 - 172800)
+        self.assertEqual(_parse_time('1700000000'), 1700000000.0)
+        self.assertEqual(_parse_time('2026-01-31 18:00'), time.mktime((2026, 1, 31, 18, 0, 0, 0, 0, -1)))
+        self.assertEqual(_parse_time('2026-01-31'), time.mktime((2026, 1, 31, 0, 0, 0, 0, 0, -1)))
+        with self.assertRaises(ValueError):
+            _parse_time('yesterday')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import os
+import socket
+import tempfile
+import unittest
+
+from socks5_proxy import DestinationACL, DestinationDenied, SOCKS5Server
+
+V4 = socket.AF_INET
+
+
+class ACLTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'acl.rules')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def acl(self, rules, default_allow=True):
+        with open(self.path, 'w') as f:
+            f.write(rules)
+        return DestinationACL(self.path, default_allow)
+
+    def allowed(self, acl, host, addresses, port, user='u'):
+        """Outcome of check() and, where it defers, screen() of the addresses host resolves to"""
+        verdict = acl.check(host, port, user)
+        if verdict is None:
+            return [ip for _, ip in acl.screen([(V4, ip) for ip in addresses], port, user, host)]
+        return addresses if verdict else []
+
+
+class FirstMatchTest(ACLTestCase):
+    def test_names_resolving_into_allowed_ranges_pass_a_final_deny_all(self):
+        acl = self.acl("allow 127.0.0.0/8 19001\ndeny *\n")
+        self.assertIs(acl.check('127.0.0.1', 19001, 'u'), True)
+        self.assertIsNone(acl.check('localhost', 19001, 'u'))
+        self.assertEqual(self.allowed(acl, 'localhost', ['127.0.0.1'], 19001), ['127.0.0.1'])
+        self.assertEqual(self.allowed(acl, 'localhost', ['127.0.0.1'], 19002), [])
+        self.assertEqual(self.allowed(acl, 'example.com', ['93.184.216.34'], 19001), [])
+
+    def test_address_rule_before_a_name_rule_wins(self):
+        acl = self.acl("deny 127.0.0.0/8\nallow localhost\n")
+        self.assertEqual(self.allowed(acl, 'localhost', ['127.0.0.1'], 80), [])
+
+    def test_name_rule_before_every_address_rule_decides_without_resolving(self):
+        acl = self.acl("allow intranet.example\ndeny 10.0.0.0/8\n")
+        self.assertIs(acl.check('intranet.example', 80, 'u'), True)
+        self.assertIs(acl.check('10.1.2.3', 80, 'u'), False)
+
+    def test_each_resolved_address_is_judged_on_its_own(self):
+        acl = self.acl("deny 10.0.0.0/8\n")
+        self.assertEqual(self.allowed(acl, 'mixed.example', ['10.0.0.1', '192.0.2.1'], 80), ['192.0.2.1'])
+
+    def test_default_applies_when_nothing_matches(self):
+        acl = self.acl("allow .example.com\n", default_allow=False)
+        self.assertIs(acl.check('example.com', 443, 'u'), True)
+        self.assertIs(acl.check('example.org', 443, 'u'), False)
+        self.assertIs(acl.check('192.0.2.1', 443, 'u'), False)
+
+
+class RuleSyntaxTest(ACLTestCase):
+    def test_name_patterns(self):
+        acl = self.acl("deny *.ads.example\ndeny .tracker.example\ndeny exact.example\n")
+        self.assertIs(acl.check('ads.example', 80, 'u'), True)
+        self.assertIs(acl.check('x.ads.example', 80, 'u'), False)
+        self.assertIs(acl.check('tracker.example', 80, 'u'), False)
+        self.assertIs(acl.check('a.b.tracker.example', 80, 'u'), False)
+        self.assertIs(acl.check('EXACT.example.', 80, 'u'), False)
+        self.assertIs(acl.check('sub.exact.example', 80, 'u'), True)
+
+    def test_ports_and_users(self):
+        acl = self.acl("allow * 80,443,8000-8100 alice,bob\ndeny *\n")
+        self.assertIs(acl.check('example.com', 8050, 'alice'), True)
+        self.assertIs(acl.check('example.com', 8101, 'alice'), False)
+        self.assertIs(acl.check('example.com', 443, 'carol'), False)
+
+    def test_ipv6_and_mapped_addresses(self):
+        acl = self.acl("deny 192.168.0.0/16\ndeny 2001:db8::/32\n")
+        self.assertIs(acl.check('::ffff:192.168.1.1', 80, 'u'), False)
+        self.assertIs(acl.check('2001:db8::1', 80, 'u'), False)
+        self.assertIs(acl.check('2001:db9::1', 80, 'u'), True)
+        self.assertFalse(acl.allows_address('::ffff:192.168.1.1', 80, 'u'))
+
+    def test_invalid_lines_are_skipped(self):
+        acl = self.acl("permit 10.0.0.0/8\ndeny 10.0.0.0/40\ndeny 10.0.0.0/8 # comment\n")
+        self.assertEqual(acl.count, 1)
+        self.assertIs(acl.check('10.0.0.1', 80, 'u'), False)
+
+    def test_reload_on_change(self):
+        acl = self.acl("deny 10.0.0.0/8\n")
+        acl.RELOAD_CHECK = 0
+        with open(self.path, 'w') as f:
+            f.write("allow 10.0.0.0/8\ndeny *\n")
+        os.utime(self.path, ns=(0, 0))  # A different stamp even within the clock's resolution
+        self.assertIs(acl.check('10.0.0.1', 80, 'u'), True)
+
+
+class ConnectScreeningTest(ACLTestCase):
+    def test_connect_by_name_is_screened_per_address(self):
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(1)
+        port = listener.getsockname()[1]
+        server = SOCKS5Server('127.0.0.1', 0, 'u', 'p')
+        try:
+            server.acl = self.acl(f"allow 127.0.0.0/8 {port}\ndeny *\n")
+            remote = server._connect_direct('localhost', port, screen_user='u')
+            self.assertEqual(remote.getpeername()[0], '127.0.0.1')
+            remote.close()
+            server.acl = self.acl("deny 127.0.0.0/8\nallow *\n")
+            with self.assertRaises(DestinationDenied):
+                server._connect_direct('localhost', port, screen_user='u')
+        finally:
+            listener.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+from socks5_proxy import AdmissionController, WorkerPool
+
+
+class AdmissionControllerTest(unittest.TestCase):
+    def test_clients_wait_for_a_slot_in_order(self):
+        admission = AdmissionController(max_connections=2, max_handshakes=2, queue_size=2, wait=10)
+        self.assertEqual(admission.offer('a'), (['a'], [], True))
+        self.assertEqual(admission.offer('b'), (['b'], [], True))
+        self.assertEqual(admission.offer('c'), ([], [], True))
+        self.assertEqual(admission.offer('d'), ([], [], True))
+        self.assertEqual(admission.offer('e'), ([], [], False))  # Queue full
+        self.assertEqual(admission.release(handshake=True, connection=False), ([], []))  # Still 2 connections
+        self.assertEqual(admission.release(handshake=False, connection=True), (['c'], []))
+        self.assertEqual((admission.connections, admission.handshakes), (2, 2))
+
+    def test_handshake_slots_are_limited_separately(self):
+        admission = AdmissionController(max_connections=10, max_handshakes=1, queue_size=5, wait=10)
+        admission.offer('a')
+        self.assertEqual(admission.offer('b'), ([], [], True))
+        self.assertEqual(admission.release(handshake=True, connection=False), (['b'], []))  # a is relaying now
+        self.assertEqual(admission.connections, 2)
+
+    def test_queued_clients_expire(self):
+        admission = AdmissionController(max_connections=1, max_handshakes=1, queue_size=5, wait=2)
+        now = time.monotonic()
+        with mock.patch('time.monotonic', return_value=now):
+            admission.offer('a')
+            admission.offer('b')
+        with mock.patch('time.monotonic', return_value=now + 1):
+            admission.offer('c')
+        with mock.patch('time.monotonic', return_value=now + 2):
+            self.assertEqual(admission.expire(), ([], ['b']))
+            self.assertEqual(admission.release(handshake=True, connection=True), (['c'], []))
+
+    def test_handshake_limit_never_exceeds_the_connection_limit(self):
+        self.assertEqual(AdmissionController(4, 100, 0, 1).max_handshakes, 4)
+        self.assertEqual(AdmissionController(4, 0, 0, 1).max_handshakes, 1)
+
+
+class WorkerPoolTest(unittest.TestCase):
+    def test_threads_are_reused_and_bounded(self):
+        pool = WorkerPool(2, 'test')
+        done = threading.Semaphore(0)
+        gate = threading.Event()
+        names = []
+
+        def task(fail):
+            gate.wait(5)
+            names.append(threading.current_thread().name)
+            done.release()
+            if fail:
+                raise RuntimeError('boom')  # Logged; the worker carries on
+
+        for i in range(5):
+            pool.submit(task, i == 0)
+        self.assertEqual(pool.threads, 2)
+        gate.set()
+        for _ in range(5):
+            self.assertTrue(done.acquire(timeout=5))
+        self.assertEqual(set(names), {'test-1', 'test-2'})
+        time.sleep(0.05)
+        pool.submit(task, False)
+        self.assertTrue(done.acquire(timeout=5))
+        self.assertEqual(pool.threads, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import time
+import unittest
+from unittest import mock
+
+from socks5_proxy import AuthLimiter
+
+
+class AuthLimiterTest(unittest.TestCase):
+    def setUp(self):
+        self.now = time.time()
+
+    def at(self, offset):
+        return mock.patch('time.time', return_value=self.now + offset)
+
+    def limiter(self, max_failures=3, window=60, prefix_failures=0, ban=0, slots=4096, shared=False):
+        return AuthLimiter(slots, max_failures, window, prefix_failures, 24, 64, ban, shared)
+
+    def test_failure_budget_refills_over_the_window(self):
+        limiter = self.limiter()
+        with self.at(0):
+            for _ in range(3):
+                self.assertTrue(limiter.allow('192.0.2.1'))
+                limiter.record('192.0.2.1')
+            self.assertFalse(limiter.allow('192.0.2.1'))
+            self.assertTrue(limiter.allow('192.0.2.2'))
+        with self.at(19.9):
+            self.assertFalse(limiter.allow('192.0.2.1'))
+        with self.at(20):  # One failure's worth (window / max_failures) has decayed
+            self.assertTrue(limiter.allow('192.0.2.1'))
+            limiter.record('192.0.2.1')
+            self.assertFalse(limiter.allow('192.0.2.1'))
+
+    def test_network_prefixes(self):
+        limiter = self.limiter(max_failures=10, prefix_failures=4)
+        with self.at(0):
+            for i in range(4):
+                limiter.record(f'198.51.100.{i}')
+            self.assertFalse(limiter.allow('198.51.100.200'))
+            self.assertTrue(limiter.allow('198.51.101.1'))
+            for i in range(4):
+                limiter.record(f'2001:db8::{i}')
+            self.assertFalse(limiter.allow('2001:db8::ffff'))
+            self.assertTrue(limiter.allow('2001:db8:0:1::1'))
+
+    def test_bans_outlast_the_budget(self):
+        limiter = self.limiter(max_failures=2, window=10, prefix_failures=100, ban=300)
+        with self.at(0):
+            self.assertEqual(limiter.record('192.0.2.1'), [])
+            self.assertEqual(limiter.record('192.0.2.1'), ['192.0.2.1'])
+            self.assertEqual(limiter.record('192.0.2.1'), [])  # Already banned
+        with self.at(299):
+            self.assertFalse(limiter.allow('192.0.2.1'))
+        with self.at(300):
+            self.assertTrue(limiter.allow('192.0.2.1'))
+
+    def test_memory_is_bounded_and_hot_offenders_survive_a_scan(self):
+        limiter = self.limiter(slots=256)
+        size = len(limiter.shm)
+        with self.at(0):
+            for _ in range(3):
+                limiter.record('192.0.2.1')
+            for i in range(5000):
+                limiter.record(f'10.{i >> 8 & 255}.{i & 255}.1')
+            self.assertFalse(limiter.allow('192.0.2.1'))
+        self.assertEqual(len(limiter.shm), size)
+
+    def test_state_is_shared_with_forked_workers(self):
+        limiter = self.limiter(shared=True)
+        pid = os.fork()
+        if pid == 0:
+            try:
+                for _ in range(3):
+                    limiter.record('192.0.2.1')
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        self.assertFalse(limiter.allow('192.0.2.1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import asyncio
+import socket
+import struct
+import unittest
+
+import socks5_bench
+from socks5_bench import MODE_ECHO, MODE_SINK, MODE_SOURCE, BenchError, open_tunnel, percentiles
+
+
+async def serve(handler):
+    server = await asyncio.start_server(handler, '127.0.0.1', 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+class PercentilesTest(unittest.TestCase):
+    def test_percentiles(self):
+        self.assertIsNone(percentiles([]))
+        samples = [i / 1000 for i in range(100, 0, -1)]  # 1..100 ms, unordered
+        self.assertEqual(percentiles(samples), {'p50': 51.0, 'p90': 90.0, 'p99': 99.0, 'max': 100.0})
+        self.assertEqual(percentiles([0.0025]), {'p50': 2.5, 'p90': 2.5, 'p99': 2.5, 'max': 2.5})
+
+
+class TargetTest(unittest.TestCase):
+    def exchange(self, request, expect=None):
+        async def main():
+            server, port = await serve(socks5_bench._target_client)
+            async with server:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                writer.write(request)
+                if expect is None:
+                    writer.write_eof()
+                data = await reader.read() if expect is None else await reader.readexactly(expect)
+                writer.close()
+                return data
+        return asyncio.run(main())
+
+    def test_echo(self):
+        self.assertEqual(self.exchange(MODE_ECHO + b'hello'), b'hello')
+
+    def test_sink_counts_what_it_discards(self):
+        self.assertEqual(self.exchange(MODE_SINK + struct.pack('!Q', 300000) + b'x' * 300000), struct.pack('!Q', 300000))
+
+    def test_source(self):
+        self.assertEqual(self.exchange(MODE_SOURCE + struct.pack('!Q', 300000), expect=300000), b'\0' * 300000)
+
+
+class OpenTunnelTest(unittest.TestCase):
+    def handshake(self, reply, cmd=1):
+        """Run open_tunnel against a scripted proxy; (result, request the proxy received)"""
+        received = []
+
+        async def proxy(reader, writer):
+            received.append(await reader.readexactly(3))
+            writer.write(b'\x05\x02')
+            received.append(await reader.readexactly(3 + len(socks5_bench.BENCH_USER) + len(socks5_bench.BENCH_PASS)))
+            writer.write(b'\x01\x00')
+            received.append(await reader.readexactly(10))
+            writer.write(reply)
+            await writer.drain()
+
+        async def main():
+            server, port = await serve(proxy)
+            async with server:
+                result = await open_tunnel(port, 4242, cmd)
+                result[1].close()
+                return result[0]
+        return asyncio.run(main()), received
+
+    def test_connect(self):
+        reader, received = self.handshake(b'\x05\x00\x00\x01' + bytes(6))
+        self.assertIsInstance(reader, asyncio.StreamReader)
+        self.assertEqual(received[0], b'\x05\x01\x02')
+        self.assertEqual(received[1], b'\x01\x05bench\x05bench')
+        self.assertEqual(received[2], b'\x05\x01\x00\x01' + socket.inet_aton('127.0.0.1') + struct.pack('!H', 4242))
+
+    def test_udp_associate_returns_the_relay_address(self):
+        reply = b'\x05\x00\x00\x04' + socket.inet_pton(socket.AF_INET6, '::1') + struct.pack('!H', 5353)
+        relay, received = self.handshake(reply, cmd=3)
+        self.assertEqual(relay, ('::1', 5353))
+        self.assertEqual(received[2][1], 3)
+        self.assertEqual(received[2][-2:], b'\x00\x00')
+
+    def test_failure_reply(self):
+        with self.assertRaisesRegex(BenchError, 'reply 5'):
+            self.handshake(b'\x05\x05\x00\x01' + bytes(6))
+
+
+if __name__ == '__main__':
+    unittest.main()
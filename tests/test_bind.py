@@ -0,0 +1,161 @@
+import errno
+import socket
+import threading
+import time
+import types
+import unittest
+
+from socks5_proxy import BindPool, DestinationACL, DNSResolver, Metrics, PendingBind, Reactor, SOCKS5Server, Tunnel
+
+
+def free_port_range(count):
+    """First port of count consecutive ports nothing listens on"""
+    for _ in range(50):
+        probe = socket.socket()
+        probe.bind(('127.0.0.1', 0))
+        first = probe.getsockname()[1]
+        probe.close()
+        if first + count > 65536:
+            continue
+        sockets = []
+        try:
+            for port in range(first, first + count):
+                sock = socket.socket()
+                sockets.append(sock)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                sock.bind(('127.0.0.1', port))
+            return first
+        except OSError:
+            pass
+        finally:
+            for sock in sockets:
+                sock.close()
+    raise RuntimeError("no free port range")
+
+
+class BindPoolTest(unittest.TestCase):
+    def test_listener_limit(self):
+        pool = BindPool(2)
+        first, second = pool.open('127.0.0.1'), pool.open('127.0.0.1')
+        with self.assertRaises(OSError) as caught:
+            pool.open('127.0.0.1')
+        self.assertEqual(caught.exception.errno, errno.EBUSY)
+        pool.close(first)
+        third = pool.open('127.0.0.1')
+        self.assertFalse(third.getblocking())
+        for sock in (second, third):
+            pool.close(sock)
+        self.assertEqual(pool.listeners, 0)
+
+    def test_port_range_round_robin(self):
+        base = free_port_range(3)
+        pool = BindPool(10, f'{base}-{base + 2}')
+        port = lambda sock: sock.getsockname()[1]
+        a = pool.open('127.0.0.1')
+        self.assertEqual(port(a), base)
+        pool.close(a)
+        busy = socket.socket()
+        busy.bind(('127.0.0.1', base + 1))
+        busy.listen(1)
+        opened = []
+        try:
+            opened.append(pool.open('127.0.0.1'))
+            self.assertEqual(port(opened[0]), base + 2)  # base + 1 is taken, base was given up last
+            opened.append(pool.open('127.0.0.1'))
+            self.assertEqual(port(opened[1]), base)
+            with self.assertRaises(OSError) as caught:
+                pool.open('127.0.0.1')
+            self.assertEqual(caught.exception.errno, errno.EADDRINUSE)
+            self.assertEqual(pool.listeners, 2)
+        finally:
+            busy.close()
+            for sock in opened:
+                pool.close(sock)
+
+
+class BindConnectedTest(unittest.TestCase):
+    def setUp(self):
+        self.server = SOCKS5Server('127.0.0.1', 0, 'u', 'p')
+        self.submitted = []
+        self.relayed = []
+        self.server.handshake_pool = types.SimpleNamespace(submit=lambda fn, *args: self.submitted.append((fn, args)))
+        self.server.relay = lambda client, remote, tunnel: self.relayed.append((client, remote, tunnel))
+        self.client, self.client_far = socket.socketpair()
+        self.peer, self.peer_far = socket.socketpair()
+        for sock in (self.client_far, self.peer_far):
+            sock.settimeout(2)
+        self.pending = types.SimpleNamespace(control=self.client, client_ip='127.0.0.1', bind_address=('0.0.0.0', 40000),
+                                             early_data=b'EARLY', tunnel=Tunnel('127.0.0.1', 'u', 'bind', 40000, 2),
+                                             on_close=lambda: None)
+
+    def tearDown(self):
+        for sock in (self.client, self.client_far, self.peer, self.peer_far):
+            sock.close()
+
+    def test_reactor_callback_does_no_blocking_io(self):
+        self.server._bind_connected(self.pending, self.peer, ('127.0.0.1', 5555))
+        self.assertEqual([fn for fn, _ in self.submitted], [self.server._relay_bind])
+        self.client_far.setblocking(False)
+        with self.assertRaises(BlockingIOError):
+            self.client_far.recv(64)  # Nothing sent from the reactor thread
+
+    def test_pool_task_replies_flushes_early_data_and_relays(self):
+        self.server._bind_connected(self.pending, self.peer, ('127.0.0.1', 5555))
+        fn, args = self.submitted[0]
+        fn(*args)
+        reply = self.client_far.recv(64)
+        self.assertEqual(reply[:2], b'\x05\x00')
+        self.assertEqual(reply[-2:], (5555).to_bytes(2, 'big'))
+        self.assertEqual(self.peer_far.recv(64), b'EARLY')
+        self.assertEqual(self.pending.tunnel.bytes_up, 5)
+        self.assertEqual(self.relayed, [(self.client, self.peer, self.pending.tunnel)])
+        self.assertIsNone(self.client.gettimeout())  # Blocking without a timeout for the relay
+
+
+class PendingBindTest(unittest.TestCase):
+    def setUp(self):
+        self.reactor = Reactor(DNSResolver(), Metrics(), 60, BindPool(4), DestinationACL(''))
+        self.client, self.client_far = socket.socketpair()
+        self.client_far.settimeout(2)
+        self.connected = []
+        self.closed = threading.Event()
+        listener = self.reactor.bind_pool.open('127.0.0.1')
+        self.pending = PendingBind(self.client, listener, '127.0.0.1', (), listener.getsockname(), b'EARLY',
+                                   Tunnel('127.0.0.1', 'u', 'bind', listener.getsockname()[1], 2), 60,
+                                   lambda pending, peer, address: self.connected.append(peer), self.closed.set)
+        self.reactor.add(self.pending)
+
+    def tearDown(self):
+        for sock in (self.client, self.client_far):
+            sock.close()
+        for peer in self.connected:
+            peer.close()
+
+    def test_early_data_is_kept_for_the_peer(self):
+        self.client_far.sendall(b' MORE')
+        peer = socket.create_connection(self.pending.bind_address, 2)
+        try:
+            for _ in range(200):
+                if self.connected:
+                    break
+                time.sleep(0.01)
+            self.assertEqual(len(self.connected), 1)
+            self.assertEqual(self.pending.early_data, b'EARLY MORE')
+        finally:
+            peer.close()
+
+    def test_client_closing_after_early_data_ends_the_bind(self):
+        self.client_far.sendall(b' MORE')
+        self.client_far.shutdown(socket.SHUT_WR)
+        self.assertTrue(self.closed.wait(2))
+        self.assertEqual(self.reactor.bind_pool.listeners, 0)
+
+    def test_too_much_early_data_fails_the_bind(self):
+        self.client_far.sendall(bytes(Reactor.MAX_EARLY_DATA))
+        self.assertTrue(self.closed.wait(2))
+        reply = self.client_far.recv(64)
+        self.assertEqual(reply[:2], b'\x05\x01')
+
+
+if __name__ == '__main__':
+    unittest.main()
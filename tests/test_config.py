@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import socks5_proxy
+from socks5_proxy import _read_config_file, reload_settings
+
+
+class ConfigFileTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'proxy.conf')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, text):
+        with open(self.path, 'w') as f:
+            f.write(text)
+
+    def test_environment_file_syntax(self):
+        self.write('# comment\n; comment\n\nSOCKS5_PORT = 1081\nSOCKS5_PASS="p w"\n'
+                   "SOCKS5_USER='u'\nSOCKS5_HOST=a=b\nnot a setting\nSOCKS5_DNS=\"x\n")
+        self.assertEqual(_read_config_file(self.path), {'SOCKS5_PORT': '1081', 'SOCKS5_PASS': 'p w',
+                                                       'SOCKS5_USER': 'u', 'SOCKS5_HOST': 'a=b', 'SOCKS5_DNS': '"x'})
+
+    def test_reload_applies_live_settings_and_reports_the_rest(self):
+        base = {'SOCKS5_IDLE_TIMEOUT': '300', 'SOCKS5_PORT': '1080', 'SOCKS5_LOG_LEVEL': 'INFO', 'PATH': '/bin'}
+        self.write('SOCKS5_IDLE_TIMEOUT=60\nSOCKS5_PORT=1081\nSOCKS5_LOG_LEVEL=debug\nSOCKS5_MAX_LIFETIME=soon\n')
+        with mock.patch.dict(os.environ, base, clear=True), \
+                mock.patch.multiple(socks5_proxy, BASE_ENV=base, CONFIG_FILE=self.path, IDLE_TIMEOUT=300,
+                                    LOG_LEVEL='INFO', MAX_LIFETIME=0):
+            applied, pending = reload_settings()
+            self.assertEqual(applied, ['SOCKS5_IDLE_TIMEOUT', 'SOCKS5_LOG_LEVEL'])
+            self.assertEqual(pending, ['SOCKS5_PORT'])  # Needs an upgrade
+            self.assertEqual((socks5_proxy.IDLE_TIMEOUT, socks5_proxy.LOG_LEVEL), (60, 'DEBUG'))
+            self.assertEqual(socks5_proxy.MAX_LIFETIME, 0)  # Invalid value: the old one stays
+            self.assertEqual(os.environ['SOCKS5_IDLE_TIMEOUT'], '60')
+            self.assertEqual(reload_settings(), ([], ['SOCKS5_PORT']))
+            self.write('')  # Back to the environment's values
+            self.assertEqual(reload_settings(), (['SOCKS5_IDLE_TIMEOUT', 'SOCKS5_LOG_LEVEL'], []))
+            self.assertEqual(socks5_proxy.IDLE_TIMEOUT, 300)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import errno
+import socket
+import unittest
+
+from socks5_proxy import _load_asyncio, happy_eyeballs_connect, happy_eyeballs_connect_async, interleave_families, normalize_ip
+
+V4, V6 = socket.AF_INET, socket.AF_INET6
+
+
+class OrderTest(unittest.TestCase):
+    def test_interleave_families(self):
+        addresses = [(V6, 'a'), (V6, 'b'), (V6, 'c'), (V4, 'x'), (V4, 'y')]
+        self.assertEqual(interleave_families(addresses),
+                         [(V6, 'a'), (V4, 'x'), (V6, 'b'), (V4, 'y'), (V6, 'c')])
+        self.assertEqual(interleave_families([(V4, 'x'), (V6, 'a')]), [(V4, 'x'), (V6, 'a')])
+        self.assertEqual(interleave_families([]), [])
+
+    def test_normalize_ip(self):
+        self.assertEqual(normalize_ip('::ffff:192.0.2.1'), '192.0.2.1')
+        self.assertEqual(normalize_ip('::ffff:c000:201'), '::ffff:c000:201')
+        self.assertEqual(normalize_ip('2001:db8::1'), '2001:db8::1')
+
+
+class ConnectTest(unittest.TestCase):
+    def setUp(self):
+        self.listener = socket.socket()
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(8)
+        self.port = self.listener.getsockname()[1]
+        closed = socket.socket()
+        closed.bind(('127.0.0.1', 0))
+        self.closed_port = closed.getsockname()[1]
+        closed.close()
+        # Same port on 127.0.0.2 with a full backlog: SYNs there go unanswered
+        self.stalled = socket.socket()
+        self.stalled.bind(('127.0.0.2', self.port))
+        self.stalled.listen(0)
+        self.fillers = []
+        for _ in range(2):
+            filler = socket.socket()
+            filler.setblocking(False)
+            filler.connect_ex(('127.0.0.2', self.port))
+            self.fillers.append(filler)
+
+    def tearDown(self):
+        for sock in [self.listener, self.stalled] + self.fillers:
+            sock.close()
+
+    def test_a_stalled_attempt_does_not_hold_up_the_next(self):
+        prepared = []
+        sock = happy_eyeballs_connect([(V4, '127.0.0.2'), (V4, '127.0.0.1')], self.port, 5, delay=0.05, prepare=prepared.append)
+        try:
+            self.assertEqual(sock.getpeername(), ('127.0.0.1', self.port))
+            self.assertEqual(len(prepared), 2)
+            self.assertIn(sock, prepared)
+        finally:
+            sock.close()
+
+    def test_the_last_error_is_raised_when_every_attempt_fails(self):
+        with self.assertRaises(OSError) as caught:
+            happy_eyeballs_connect([(V4, '127.0.0.1'), (V4, '127.0.0.2')], self.closed_port, 5)
+        self.assertEqual(caught.exception.errno, errno.ECONNREFUSED)
+        with self.assertRaises(OSError):
+            happy_eyeballs_connect([], self.port, 5)
+
+    def test_async(self):
+        _load_asyncio()  # As the asyncio engine does on start
+        import asyncio
+        sock = asyncio.run(happy_eyeballs_connect_async([(V4, '127.0.0.2'), (V4, '127.0.0.1')], self.port, delay=0.05))
+        try:
+            self.assertEqual(sock.getpeername(), ('127.0.0.1', self.port))
+        finally:
+            sock.close()
+        with self.assertRaises(OSError) as caught:
+            asyncio.run(happy_eyeballs_connect_async([(V4, '127.0.0.1')], self.closed_port))
+        self.assertEqual(caught.exception.errno, errno.ECONNREFUSED)
+
+
+if __name__ == '__main__':
+    unittest.main()
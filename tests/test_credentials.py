@@ -0,0 +1,102 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from socks5_proxy import Credential, CredentialStore, hash_password
+
+ITERATIONS = 1000  # Fast hashes for the tests
+
+
+class CredentialTest(unittest.TestCase):
+    def test_hash_round_trip(self):
+        encoded = hash_password('s3cret', ITERATIONS)
+        scheme, iterations, _, _ = encoded.split('$')
+        self.assertEqual((scheme, iterations), ('pbkdf2_sha256', str(ITERATIONS)))
+        self.assertNotEqual(encoded, hash_password('s3cret', ITERATIONS))  # Salted
+        credential = Credential.parse(encoded, 5)
+        self.assertTrue(credential.verify('s3cret'))
+        self.assertFalse(credential.verify('s3cret '))
+        self.assertEqual(credential.max_connections, 5)
+        with self.assertRaises(ValueError):
+            Credential.parse('md5$1$abc$def', 0)
+
+
+class CredentialStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'users')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def store(self, lines, cache_ttl=300):
+        self.write(lines)
+        return CredentialStore(self.path, 'admin', 'ignored', cache_ttl, default_max_connections=7)
+
+    def write(self, lines):
+        with open(self.path, 'w') as f:
+            f.write(''.join(line + '\n' for line in lines))
+
+    def test_single_user_without_a_file(self):
+        store = CredentialStore(None, 'admin', 'pw', 300, default_max_connections=3)
+        self.assertIs(store.verify_cached('admin', 'pw'), True)
+        self.assertIs(store.verify_cached('admin', 'nope'), False)
+        self.assertIsNone(store.verify_cached('root', 'pw'))
+        self.assertEqual(store.max_connections('admin'), 3)
+
+    def test_users_file(self):
+        store = self.store([
+            '# comment',
+            f"alice:{hash_password('a-pw', ITERATIONS)}:2",
+            f"bob:{hash_password('b-pw', ITERATIONS)}",
+            'carol:md5$1$x$y',
+            'dave',
+        ])
+        self.assertEqual(sorted(store.users), ['alice', 'bob'])
+        self.assertEqual((store.max_connections('alice'), store.max_connections('bob')), (2, 7))
+        self.assertEqual(store.max_connections('nobody'), 0)
+        self.assertTrue(store.verify('alice', 'a-pw'))
+        self.assertFalse(store.verify('alice', 'b-pw'))
+
+    def test_successes_are_cached_until_the_ttl(self):
+        store = self.store([f"alice:{hash_password('a-pw', ITERATIONS)}"], cache_ttl=60)
+        now = time.monotonic()
+        with mock.patch('time.monotonic', return_value=now):
+            self.assertIsNone(store.verify_cached('alice', 'a-pw'))
+            self.assertTrue(store.verify('alice', 'a-pw'))
+            with mock.patch.object(Credential, 'verify', side_effect=AssertionError('hashed again')):
+                self.assertIs(store.verify_cached('alice', 'a-pw'), True)
+                self.assertTrue(store.verify('alice', 'a-pw'))
+            self.assertIsNone(store.verify_cached('alice', 'wrong'))  # Failures always take the slow path
+        with mock.patch('time.monotonic', return_value=now + 61):
+            self.assertIsNone(store.verify_cached('alice', 'a-pw'))
+
+    def test_unknown_users_cost_a_hash(self):
+        store = self.store([f"alice:{hash_password('a-pw', ITERATIONS)}"])
+        with mock.patch.object(store.dummy, 'verify') as dummy:
+            self.assertFalse(store.verify('mallory', 'a-pw'))
+        dummy.assert_called_once_with('a-pw')
+
+    def test_unknown_users_cost_a_plain_compare_without_a_file(self):
+        store = CredentialStore(None, 'admin', 'pw', 300)
+        self.assertEqual(len(store.dummy.plain), len(b'pw'))
+        with mock.patch('hashlib.pbkdf2_hmac', side_effect=AssertionError('hashed')):
+            self.assertFalse(store.verify('root', 'pw'))
+            self.assertFalse(store.verify('admin', 'nope'))
+
+    def test_reload_on_change(self):
+        store = self.store([f"alice:{hash_password('a-pw', ITERATIONS)}"])
+        store.RELOAD_CHECK = 0
+        self.assertTrue(store.verify('alice', 'a-pw'))
+        self.write([f"alice:{hash_password('new-pw', ITERATIONS)}"])
+        os.utime(self.path, ns=(0, 0))  # A different stamp even within the clock's resolution
+        self.assertFalse(store.verify('alice', 'a-pw'))
+        self.assertTrue(store.verify('alice', 'new-pw'))
+        os.unlink(self.path)
+        self.assertTrue(store.verify('alice', 'new-pw'))  # The last good list stays
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+import asyncio
+import socket
+import struct
+import threading
+import time
+import unittest
+from unittest import mock
+
+from socks5_proxy import DNSResolver, DNSTruncated, _load_asyncio
+
+V4, V6 = socket.AF_INET, socket.AF_INET6
+
+
+class FakeQueries:
+    """Stands in for DNSResolver._query, counting the lookups"""
+
+    def __init__(self, answer=None, error=None, gate=None):
+        self.answer = answer
+        self.error = error
+        self.gate = gate
+        self.calls = []
+
+    def __call__(self, host):
+        self.calls.append(host)
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.answer
+
+
+class CacheTest(unittest.TestCase):
+    def resolver(self, queries, **kwargs):
+        resolver = DNSResolver(**kwargs)
+        resolver._query = queries
+        return resolver
+
+    def test_literals_skip_the_cache(self):
+        queries = FakeQueries()
+        resolver = self.resolver(queries)
+        self.assertEqual(resolver.resolve('192.0.2.1'), [(V4, '192.0.2.1')])
+        self.assertEqual(resolver.resolve_cached('2001:db8::1'), [(V6, '2001:db8::1')])
+        self.assertEqual((queries.calls, resolver.hits, resolver.misses), ([], 0, 0))
+
+    def test_answers_are_cached_for_their_ttl(self):
+        queries = FakeQueries(([(V4, '192.0.2.1')], 30))
+        resolver = self.resolver(queries)
+        now = time.monotonic()
+        with mock.patch('time.monotonic', return_value=now):
+            self.assertIsNone(resolver.resolve_cached('example.com'))
+            self.assertEqual(resolver.resolve('Example.COM.'), [(V4, '192.0.2.1')])
+            self.assertEqual(resolver.resolve_cached('example.com'), [(V4, '192.0.2.1')])
+        with mock.patch('time.monotonic', return_value=now + 29.9):
+            resolver.resolve('example.com')
+        self.assertEqual(queries.calls, ['example.com'])
+        with mock.patch('time.monotonic', return_value=now + 30):
+            resolver.resolve('example.com')
+        self.assertEqual(len(queries.calls), 2)
+
+    def test_nxdomain_is_cached_for_the_negative_ttl(self):
+        queries = FakeQueries(error=socket.gaierror(socket.EAI_NONAME, 'no such name'))
+        resolver = self.resolver(queries, negative_ttl=5)
+        now = time.monotonic()
+        with mock.patch('time.monotonic', return_value=now):
+            for _ in range(2):
+                with self.assertRaises(socket.gaierror) as caught:
+                    resolver.resolve('missing.example')
+                self.assertEqual(caught.exception.errno, socket.EAI_NONAME)
+        self.assertEqual(len(queries.calls), 1)
+        with mock.patch('time.monotonic', return_value=now + 5):
+            with self.assertRaises(socket.gaierror):
+                resolver.resolve('missing.example')
+        self.assertEqual(len(queries.calls), 2)
+
+    def test_temporary_failures_are_not_cached(self):
+        queries = FakeQueries(error=socket.gaierror(socket.EAI_AGAIN, 'timed out'))
+        resolver = self.resolver(queries)
+        for _ in range(2):
+            with self.assertRaises(socket.gaierror):
+                resolver.resolve('flaky.example')
+        self.assertEqual(len(queries.calls), 2)
+        self.assertEqual(len(resolver.cache), 0)
+
+    def test_least_recently_used_names_are_dropped(self):
+        queries = FakeQueries(([(V4, '192.0.2.1')], 60))
+        resolver = self.resolver(queries, cache_size=2)
+        for host in ('a.example', 'b.example', 'a.example', 'c.example'):
+            resolver.resolve(host)
+        self.assertEqual(list(resolver.cache), ['a.example', 'c.example'])
+
+    def test_concurrent_lookups_share_one_query(self):
+        gate = threading.Event()
+        queries = FakeQueries(([(V4, '192.0.2.1')], 60), gate=gate)
+        resolver = self.resolver(queries)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(resolver.resolve('example.com'))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        gate.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(results, [[(V4, '192.0.2.1')]] * 4)
+        self.assertEqual(len(queries.calls), 1)
+
+    def test_concurrent_async_lookups_share_one_query(self):
+        _load_asyncio()  # As the asyncio engine does on start
+        queries = FakeQueries(([(V4, '192.0.2.1')], 60))
+        resolver = self.resolver(queries)
+
+        async def main():
+            return await asyncio.gather(*(resolver.resolve_async('example.com') for _ in range(4)))
+
+        self.assertEqual(asyncio.run(main()), [[(V4, '192.0.2.1')]] * 4)
+        self.assertEqual(len(queries.calls), 1)
+        self.assertEqual(resolver.inflight_async, {})
+
+
+class ResponseTest(unittest.TestCase):
+    def response(self, qid, flags, answers):
+        question = b'\x07example\x03com\x00' + struct.pack('!HH', 1, 1)
+        records = b''.join(b'\xc0\x0c' + struct.pack('!HHIH', rtype, 1, ttl, len(rdata)) + rdata
+                           for rtype, ttl, rdata in answers)
+        return struct.pack('!HHHHHH', qid, flags, 1, len(answers), 0, 0) + question + records
+
+    def test_answers_with_compressed_names(self):
+        resolver = DNSResolver()
+        msg = self.response(0x1234, 0x8180, [
+            (5, 300, b'\xc0\x0c'),  # CNAME, skipped
+            (1, 120, socket.inet_aton('192.0.2.1')),
+            (28, 60, socket.inet_pton(V6, '2001:db8::1')),
+        ])
+        self.assertEqual(resolver._parse_response(msg, 0x1234),
+                         (0, [(V4, '192.0.2.1', 120), (V6, '2001:db8::1', 60)]))
+
+    def test_foreign_truncated_and_nxdomain_responses(self):
+        resolver = DNSResolver()
+        self.assertIsNone(resolver._parse_response(self.response(1, 0x8180, []), 2))
+        self.assertIsNone(resolver._parse_response(self.response(1, 0x0100, []), 1))  # A query, not a response
+        with self.assertRaises(DNSTruncated):
+            resolver._parse_response(self.response(1, 0x8380, []), 1)
+        self.assertEqual(resolver._parse_response(self.response(1, 0x8183, []), 1), (3, []))
+
+    def test_udp_answers_list_ipv6_first_whichever_reply_comes_first(self):
+        response = self.response
+        records = {1: (1, 300, socket.inet_aton('192.0.2.1')), 28: (28, 300, socket.inet_pton(V6, '2001:db8::1'))}
+
+        class Nameserver:
+            def __init__(self, *args):
+                self.queries = []
+
+            def send(self, query):
+                self.queries.append(query)
+
+            def recv(self, size):
+                query = min(self.queries, key=lambda q: q[-4:-2] != b'\x00\x01')  # The A reply comes first
+                self.queries.remove(query)
+                (qid,), (qtype,) = struct.unpack('!H', query[:2]), struct.unpack('!H', query[-4:-2])
+                return response(qid, 0x8180, [records[qtype]])
+
+            def connect(self, address):
+                pass
+
+            def settimeout(self, timeout):
+                pass
+
+            def close(self):
+                pass
+
+        with mock.patch('socket.socket', Nameserver):
+            addresses, _ = DNSResolver(mode='udp', nameserver='192.0.2.53')._query_udp('example.com')
+        self.assertEqual(addresses, [(V6, '2001:db8::1'), (V4, '192.0.2.1')])
+
+    def test_query_encoding(self):
+        query = DNSResolver()._build_query(0xbeef, 'www.example.com.', DNSResolver.QTYPE_AAAA)
+        self.assertEqual(query, struct.pack('!HHHHHH', 0xbeef, 0x0100, 1, 0, 0, 0)
+                         + b'\x03www\x07example\x03com\x00' + struct.pack('!HH', 28, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import socket
+import struct
+import unittest
+
+from socks5_proxy import HandshakeError, HandshakeParser, build_reply
+
+GREETING = b'\x05\x02\x00\x02'
+AUTH = b'\x01\x05alice\x06s3cret'
+REQUEST = b'\x05\x01\x00\x03\x0bexample.com\x01\xbb'
+EXPECTED = [('greeting', b'\x00\x02'), ('auth', 'alice', 's3cret'), ('request', 1, 'example.com', 443)]
+
+
+def messages(parser):
+    out = []
+    while True:
+        message = parser.next_message()
+        if message is None:
+            return out
+        out.append(message)
+
+
+class HandshakeParserTest(unittest.TestCase):
+    def test_pipelined_negotiation_with_early_data(self):
+        parser = HandshakeParser()
+        parser.feed(GREETING + AUTH + REQUEST + b'GET / HTTP/1.1\r\n')
+        self.assertEqual(messages(parser), EXPECTED)
+        self.assertEqual(parser.username, 'alice')
+        self.assertEqual(parser.leftover(), b'GET / HTTP/1.1\r\n')
+        self.assertEqual(parser.leftover(), b'')
+
+    def test_one_byte_at_a_time(self):
+        parser = HandshakeParser()
+        seen = []
+        for byte in GREETING + AUTH + REQUEST:
+            parser.feed(bytes([byte]))
+            seen.extend(messages(parser))
+        self.assertEqual(seen, EXPECTED)
+        self.assertEqual(parser.state, HandshakeParser.DONE)
+
+    def test_address_types(self):
+        for address_type, address, expected in ((1, socket.inet_aton('192.0.2.1'), '192.0.2.1'),
+                                                (4, socket.inet_pton(socket.AF_INET6, '2001:db8::1'), '2001:db8::1')):
+            parser = HandshakeParser()
+            parser.feed(GREETING + AUTH + bytes([5, 3, 0, address_type]) + address + struct.pack('!H', 53))
+            self.assertEqual(messages(parser)[-1], ('request', 3, expected, 53))
+
+    def test_unsupported_version(self):
+        parser = HandshakeParser()
+        parser.feed(b'\x04\x01\x00\x50')
+        with self.assertRaisesRegex(HandshakeError, 'version 4'):
+            parser.next_message()
+
+    def test_unknown_address_type_queues_reply_8(self):
+        parser = HandshakeParser()
+        parser.feed(GREETING + AUTH + b'\x05\x01\x00\x07')
+        parser.reply(b'\x05\x02')
+        parser.reply(b'\x01\x00')
+        with self.assertRaises(HandshakeError):
+            messages(parser)
+        self.assertEqual(parser.take_replies(), b'\x05\x02\x01\x00' + build_reply(8))
+        self.assertEqual(parser.take_replies(), b'')
+
+
+class BuildReplyTest(unittest.TestCase):
+    def test_replies(self):
+        self.assertEqual(build_reply(1), b'\x05\x01\x00\x01' + bytes(6))
+        self.assertEqual(build_reply(0, ('192.0.2.1', 1080)), b'\x05\x00\x00\x01\xc0\x00\x02\x01\x04\x38')
+        self.assertEqual(build_reply(0, ('::1', 80, 0, 0)),
+                         b'\x05\x00\x00\x04' + socket.inet_pton(socket.AF_INET6, '::1') + b'\x00\x50')
+
+
+if __name__ == '__main__':
+    unittest.main()
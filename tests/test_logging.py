@@ -0,0 +1,107 @@
+import json
+import logging
+import os
+import tempfile
+import time
+import unittest
+
+from socks5_proxy import LogWriter
+
+
+def record(message, created=None, level=logging.INFO, **extra):
+    fields = {'name': 'test', 'levelno': level, 'levelname': logging.getLevelName(level), 'msg': message}
+    fields.update(extra)
+    entry = logging.makeLogRecord(fields)
+    if created is not None:
+        entry.created = created
+    return entry
+
+
+class LogWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'proxy.log')
+        self.writers = []
+
+    def tearDown(self):
+        for writer in self.writers:
+            writer.close()
+        self.directory.cleanup()
+
+    def writer(self, **kwargs):
+        writer = LogWriter(self.path, flush_interval=3600, **kwargs)
+        self.writers.append(writer)
+        return writer
+
+    def lines(self):
+        with open(self.path) as f:
+            return f.read().splitlines()
+
+    def test_nothing_is_written_until_flushed(self):
+        writer = self.writer()
+        writer.emit(record('hello'))
+        self.assertEqual(self.lines(), [])
+        writer.flush()
+        self.assertTrue(self.lines()[0].endswith(' - INFO - hello'))
+
+    def test_repetitive_messages_are_sampled_and_summarised(self):
+        writer = self.writer(sample_burst=3, sample_window=60)
+        now = time.time()
+        for i in range(10):
+            writer.emit(record(f'refused {i}', now, sample=('refused', '10.0.0.2')))
+        writer.emit(record('other', now, sample='other'))
+        writer.flush()
+        self.assertEqual([line.split(' - ')[-1] for line in self.lines()],
+                         ['refused 0', 'refused 1', 'refused 2', 'other'])
+        writer.emit(record('refused again', now + 60, sample=('refused', '10.0.0.2')))
+        writer.flush()
+        self.assertEqual([line.split(' - ')[-1] for line in self.lines()[4:]],
+                         ['Suppressed 7 similar messages (refused 10.0.0.2)', 'refused again'])
+
+    def test_hourly_cap(self):
+        writer = self.writer(max_bytes_hour=200)
+        hour = (time.time() // 3600) * 3600
+        for i in range(20):
+            writer.emit(record(f'message {i}', hour + 1))
+        writer.flush()
+        lines = self.lines()
+        self.assertLess(len(lines), 10)
+        self.assertIn('Hourly log cap of 200 bytes reached', lines[-1])
+        writer.emit(record('next hour', hour + 3601))
+        writer.flush()
+        self.assertIn('messages were dropped', self.lines()[len(lines)])
+        self.assertTrue(self.lines()[-1].endswith('next hour'))
+
+    def test_queue_overflow_is_reported(self):
+        writer = self.writer()
+        writer.QUEUE_MAX = 2
+        for i in range(5):
+            writer.emit(record(f'message {i}'))
+        writer.flush()
+        self.assertEqual(len(self.lines()), 3)
+        self.assertIn('Log queue full, dropped 3 messages', self.lines()[-1])
+
+    def test_json_lines_carry_extra_fields(self):
+        writer = self.writer(fmt='json')
+        writer.emit(record('tunnel closed', client='10.0.0.2', bytes_up=42, sample='closed'))
+        writer.flush()
+        entry = json.loads(self.lines()[0])
+        self.assertEqual((entry['level'], entry['msg'], entry['client'], entry['bytes_up']),
+                         ('INFO', 'tunnel closed', '10.0.0.2', 42))
+        self.assertNotIn('sample', entry)
+
+    def test_reopen_after_rotation(self):
+        writer = self.writer()
+        writer.emit(record('before'))
+        writer.flush()
+        os.rename(self.path, self.path + '.1')
+        writer.reopen()
+        writer.emit(record('after'))
+        writer.flush()
+        self.assertTrue(self.lines()[0].endswith('after'))
+        with open(self.path + '.1') as f:
+            self.assertTrue(f.read().rstrip().endswith('before'))
+
+
+if __name__ == '__main__':
+    unittest.main()
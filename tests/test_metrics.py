@@ -0,0 +1,64 @@
+import unittest
+
+from socks5_proxy import Histogram, Metrics, Tunnel
+
+
+class HistogramTest(unittest.TestCase):
+    def test_buckets_and_quantiles(self):
+        histogram = Histogram((0.01, 0.1, 1.0))
+        self.assertIsNone(histogram.quantile(0.5))
+        for value in (0.005, 0.01, 0.05, 0.5, 5.0):
+            histogram.observe(value)
+        counts, total, count = histogram.snapshot()
+        self.assertEqual(counts, [2, 1, 1, 1])  # Upper bounds are inclusive, as in Prometheus
+        self.assertAlmostEqual(total, 5.565)
+        self.assertEqual(count, 5)
+        self.assertEqual(histogram.quantile(0.4), 0.01)
+        self.assertEqual(histogram.quantile(0.5), 0.1)
+        self.assertEqual(histogram.quantile(0.99), float('inf'))
+
+
+class RenderTest(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics()
+        self.metrics.inc('auth_failures')
+        self.metrics.reply(0)
+        self.metrics.error('timeout')
+        self.metrics.observe('connect', 0.02)
+        self.tunnel = Tunnel('10.0.0.2', 'alice', 'example.com', 443)
+        self.metrics.open_tunnel(self.tunnel)
+        self.tunnel.count(True, 100)
+        self.tunnel.count(False, 1000)
+
+    def test_prometheus(self):
+        text = self.metrics.render_prometheus({'open_tunnels': ('Open tunnels', 1)}, {'dns_cache_hits': ('DNS cache hits', 7)})
+        lines = text.splitlines()
+        self.assertIn('socks5_auth_failures_total 1', lines)
+        self.assertIn('# TYPE socks5_dns_cache_hits_total counter', lines)
+        self.assertIn('socks5_dns_cache_hits_total 7', lines)
+        self.assertIn('socks5_replies_total{code="succeeded"} 1', lines)
+        self.assertIn('socks5_errors_total{type="timeout"} 1', lines)
+        self.assertIn('socks5_bytes_total{direction="up"} 100', lines)
+        self.assertIn('# TYPE socks5_open_tunnels gauge', lines)
+        self.assertIn('socks5_connect_latency_seconds_bucket{le="0.025"} 1', lines)
+        self.assertIn('socks5_connect_latency_seconds_bucket{le="+Inf"} 1', lines)
+        self.assertIn('socks5_connect_latency_seconds_count 1', lines)
+        self.assertTrue(text.endswith('\n'))
+
+    def test_closed_tunnels_keep_their_bytes(self):
+        self.metrics.close_tunnel(self.tunnel)
+        self.assertEqual(self.metrics.byte_totals(), (100, 1000))
+        snapshot = self.metrics.snapshot({})
+        self.assertEqual(snapshot['tunnels'], [])
+
+    def test_snapshot_lists_live_tunnels(self):
+        snapshot = self.metrics.snapshot({'open_tunnels': ('Open tunnels', 1)}, {'dns_cache_hits': ('DNS cache hits', 7)})
+        self.assertEqual((snapshot['gauges'], snapshot['counters']['dns_cache_hits']), ({'open_tunnels': 1}, 7))
+        tunnel, = snapshot['tunnels']
+        self.assertEqual((tunnel['client'], tunnel['user'], tunnel['target']), ('10.0.0.2', 'alice', 'example.com:443'))
+        self.assertEqual((tunnel['bytes_up'], tunnel['bytes_down']), (100, 1000))
+        self.assertEqual(snapshot['latency']['connect']['count'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
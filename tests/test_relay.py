@@ -0,0 +1,175 @@
+import os
+import socket
+import threading
+import time
+import unittest
+
+from socks5_proxy import HAS_SPLICE, BufferPool, SOCKS5Server, Tunnel, _load_asyncio
+
+PAYLOAD = os.urandom(1 << 20)
+
+
+def tcp_pair():
+    listener = socket.create_server(('127.0.0.1', 0))
+    near = socket.create_connection(listener.getsockname())
+    far, _ = listener.accept()
+    listener.close()
+    return near, far
+
+
+def read_exactly(sock, n):
+    data = bytearray()
+    while len(data) < n:
+        chunk = sock.recv(n - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return bytes(data)
+
+
+class RelayTest(unittest.TestCase):
+    """A tunnel between a client and a target, relayed by each engine and relay mode"""
+    ENGINE = 'threads'
+    RELAY_MODE = 'copy'
+
+    def setUp(self):
+        self.server = SOCKS5Server('127.0.0.1', 0, 'u', 'p', engine=self.ENGINE, relay_mode=self.RELAY_MODE)
+        self.finished = threading.Event()
+        self.server._finish_tunnel = lambda tunnel: self.finished.set()
+        self.client, self.proxy_client = tcp_pair()
+        self.proxy_remote, self.target = tcp_pair()
+        for sock in (self.client, self.target):
+            sock.settimeout(5)
+        self.tunnel = Tunnel('127.0.0.1', 'u', 'target', 80)
+
+    def tearDown(self):
+        for sock in (self.client, self.proxy_client, self.proxy_remote, self.target):
+            sock.close()
+
+    def start(self):
+        """Relay in the background as the engine would; returns a function waiting for the end"""
+        if self.ENGINE == 'threads':
+            self.server.relay(self.proxy_client, self.proxy_remote, self.tunnel)
+            return lambda: self.assertTrue(self.finished.wait(5))
+        _load_asyncio()
+        import asyncio
+        for sock in (self.proxy_client, self.proxy_remote):
+            sock.setblocking(False)
+        thread = threading.Thread(target=asyncio.run,
+                                  args=(self.server.relay_async(self.proxy_client, self.proxy_remote, self.tunnel),))
+        thread.start()
+
+        def wait():
+            thread.join(5)
+            self.assertFalse(thread.is_alive())
+        return wait
+
+    def test_both_directions_and_teardown_on_eof(self):
+        wait = self.start()
+        sender = threading.Thread(target=self.client.sendall, args=(PAYLOAD,))
+        sender.start()
+        self.assertEqual(read_exactly(self.target, len(PAYLOAD)), PAYLOAD)
+        sender.join(5)
+        self.target.sendall(b'reply')
+        self.assertEqual(read_exactly(self.client, 5), b'reply')
+        self.client.shutdown(socket.SHUT_WR)
+        wait()
+        self.assertEqual(self.target.recv(1), b'')  # The tunnel ends when either side is done
+        self.assertEqual((self.tunnel.bytes_up, self.tunnel.bytes_down), (len(PAYLOAD), 5))
+        self.assertEqual(len(self.server.tunnel_timers), 0)
+
+    def test_target_closing_ends_the_tunnel(self):
+        wait = self.start()
+        self.target.sendall(b'bye')
+        self.target.close()
+        self.assertEqual(read_exactly(self.client, 4), b'bye')
+        wait()
+
+
+class AsyncioRelayTest(RelayTest):
+    ENGINE = 'asyncio'
+
+
+@unittest.skipUnless(HAS_SPLICE, "splice() not available")
+class SpliceRelayTest(RelayTest):
+    RELAY_MODE = 'splice'
+
+    def test_splice_stays_in_use(self):
+        self.test_both_directions_and_teardown_on_eof()
+        self.assertTrue(self.server.use_splice)  # No fallback to the copy loop
+
+
+@unittest.skipUnless(HAS_SPLICE, "splice() not available")
+class AsyncioSpliceRelayTest(SpliceRelayTest):
+    ENGINE = 'asyncio'
+
+
+class Recorder:
+    """Destination that keeps the size of every write"""
+
+    def __init__(self):
+        self.writes = []
+
+    def sendall(self, data):
+        self.writes.append(len(data))
+
+
+class BufferPoolTest(unittest.TestCase):
+    def test_release_reuses_and_caps_idle_bytes(self):
+        pool = BufferPool(chunk_size=1024, max_chunk_size=4096, max_idle_bytes=2048)
+        first, second, third = pool.acquire(), pool.acquire(), pool.acquire()
+        self.assertEqual(pool.busy_bytes, 3072)
+        for buf in (first, second, third):
+            pool.release(buf)
+        self.assertEqual((pool.busy_bytes, pool.idle_bytes), (0, 2048))  # The third one was dropped
+        self.assertIs(pool.acquire(), second)
+
+    def test_grow_doubles_up_to_the_max(self):
+        pool = BufferPool(chunk_size=1024, max_chunk_size=4096)
+        buf = pool.grow(pool.grow(pool.acquire()))
+        self.assertEqual(len(buf), 4096)
+        self.assertIs(pool.grow(buf), buf)
+        self.assertEqual(pool.busy_bytes, 4096)
+        pool.release(buf)
+        self.assertEqual(pool.busy_bytes, 0)
+
+
+class CopyPumpTest(unittest.TestCase):
+    def setUp(self):
+        self.server = SOCKS5Server('127.0.0.1', 0, 'u', 'p', relay_mode='copy')
+        self.source, self.far = tcp_pair()
+
+    def tearDown(self):
+        self.source.close()
+        self.far.close()
+
+    def test_chunk_grows_while_reads_fill_the_buffer(self):
+        pool = self.server.buffer_pool
+        self.far.sendall(PAYLOAD)
+        self.far.close()
+        destination = Recorder()
+        self.server._copy_pump(self.source, destination)
+        self.assertEqual(sum(destination.writes), len(PAYLOAD))
+        self.assertEqual(destination.writes[:pool.GROW_AFTER], [pool.chunk_size] * pool.GROW_AFTER)
+        self.assertEqual(max(destination.writes), pool.max_chunk_size)
+        self.assertEqual(pool.busy_bytes, 0)
+
+    def test_idle_source_holds_no_buffer(self):
+        pool = self.server.buffer_pool
+        destination = Recorder()
+        pump = threading.Thread(target=self.server._copy_pump, args=(self.source, destination))
+        pump.start()
+        self.far.sendall(b'x')
+        for _ in range(100):
+            if destination.writes and not pool.busy_bytes:
+                break
+            time.sleep(0.01)
+        self.assertEqual(destination.writes, [1])
+        self.assertEqual(pool.busy_bytes, 0)  # Given back once the source ran dry
+        self.far.close()
+        pump.join(5)
+        self.assertFalse(pump.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
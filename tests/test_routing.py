@@ -0,0 +1,194 @@
+import os
+import socket
+import struct
+import tempfile
+import unittest
+
+from socks5_proxy import Router, RouteTable, Upstream, UpstreamError, UpstreamHandshake, parse_upstreams
+
+V4 = socket.AF_INET
+
+
+def feed_all(handshake, *chunks):
+    return b''.join(handshake.feed(chunk) for chunk in chunks)
+
+
+class RulesFile(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'routes')
+        self.upstreams = parse_upstreams('vps=socks5://10.9.9.9 backup=http://10.8.8.8:3128')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, rules):
+        with open(self.path, 'w') as f:
+            f.write(rules)
+        return self.path
+
+
+class RouteTableTest(RulesFile):
+    def table(self, rules):
+        return RouteTable(self.write(rules), dict(self.upstreams, direct=Upstream('direct')))
+
+    def names(self, group):
+        return None if group is None else [path.name for path in group]
+
+    def test_name_rule_before_address_rules_decides(self):
+        table = self.table("vps *\ndirect 10.0.0.0/8\n")
+        self.assertEqual(self.names(table.route('intranet', 80, 'u')), ['vps'])
+        self.assertEqual(self.names(table.route('10.1.2.3', 80, 'u')), ['vps'])
+
+    def test_earlier_address_rule_needs_the_resolved_addresses(self):
+        table = self.table("direct 10.0.0.0/8\nvps,backup *\n")
+        self.assertIsNone(table.route('intranet', 80, 'u'))
+        self.assertEqual(self.names(table.route('intranet', 80, 'u', [(V4, '10.1.2.3')])), ['direct'])
+        self.assertEqual(self.names(table.route('example.com', 80, 'u', [(V4, '192.0.2.1')])), ['vps', 'backup'])
+        self.assertEqual(self.names(table.route('10.1.2.3', 80, 'u')), ['direct'])
+
+    def test_no_match_means_the_default_route(self):
+        table = self.table("vps .example.com 443\n")
+        self.assertEqual(self.names(table.route('www.example.com', 443, 'u')), ['vps'])
+        self.assertEqual(table.route('www.example.com', 80, 'u'), ())
+        self.assertEqual(self.table("").route('example.com', 80, 'u'), ())
+
+    def test_unknown_upstreams_skip_the_rule(self):
+        table = self.table("nowhere *\nbackup *\n")
+        self.assertEqual(table.count, 1)
+        self.assertEqual(self.names(table.route('example.com', 80, 'u')), ['backup'])
+
+
+class UpstreamTest(unittest.TestCase):
+    def test_urls(self):
+        vps = Upstream('vps', 'socks5://alice:s3:cret@proxy.example')
+        self.assertEqual((vps.scheme, vps.host, vps.port), ('socks5', 'proxy.example', 1080))
+        self.assertEqual((vps.username, vps.password), ('alice', 's3:cret'))
+        http = Upstream('web', 'http://[2001:db8::1]:3128/')
+        self.assertEqual((http.scheme, http.host, http.port, http.username), ('http', '2001:db8::1', 3128, ''))
+        self.assertEqual(Upstream('web', 'http://10.0.0.1').port, 8080)
+        for url in ('ftp://10.0.0.1', '10.0.0.1:1080', 'socks5://:1080', 'socks5://host:port'):
+            with self.assertRaises(ValueError, msg=url):
+                Upstream('bad', url)
+
+    def test_parse_upstreams(self):
+        upstreams = parse_upstreams('VPS=socks5://10.0.0.1, backup_2=http://10.0.0.2')
+        self.assertEqual(sorted(upstreams), ['backup_2', 'vps'])
+        for value in ('direct=socks5://10.0.0.1', 'vps', 'v-p-s=socks5://10.0.0.1'):
+            with self.assertRaises(ValueError, msg=value):
+                parse_upstreams(value)
+
+    def test_proxies_back_off_after_repeated_failures(self):
+        vps, direct = Upstream('vps', 'socks5://10.0.0.1'), Upstream('direct')
+        for _ in range(Upstream.FAIL_LIMIT):
+            vps.record(None)
+            direct.record(None)
+        self.assertGreater(vps.down_until, 0)
+        self.assertEqual(direct.down_until, 0)
+        vps.record(0.1)
+        self.assertEqual((vps.failures, vps.down_until), (0, 0))
+
+
+class SOCKS5HandshakeTest(unittest.TestCase):
+    def test_no_authentication(self):
+        handshake = UpstreamHandshake(Upstream('vps', 'socks5://10.0.0.1'), 'example.com', 443)
+        self.assertEqual(handshake.start(), b'\x05\x01\x00')
+        request = handshake.feed(b'\x05\x00')
+        self.assertEqual(request, b'\x05\x01\x00\x03\x0bexample.com' + struct.pack('!H', 443))
+        reply = b'\x05\x00\x00\x01' + socket.inet_aton('10.0.0.1') + struct.pack('!H', 5000)
+        self.assertEqual(feed_all(handshake, reply[:4], reply[4:] + b'HELLO'), b'')
+        self.assertTrue(handshake.done)
+        self.assertEqual(handshake.leftover(), b'HELLO')
+
+    def test_username_password(self):
+        handshake = UpstreamHandshake(Upstream('vps', 'socks5://al:pw@10.0.0.1'), '2001:db8::1', 22)
+        self.assertEqual(handshake.start(), b'\x05\x02\x00\x02')
+        self.assertEqual(handshake.feed(b'\x05\x02'), b'\x01\x02al\x02pw')
+        request = handshake.feed(b'\x01\x00')
+        self.assertEqual(request, b'\x05\x01\x00\x04' + socket.inet_pton(socket.AF_INET6, '2001:db8::1') + b'\x00\x16')
+        self.assertFalse(handshake.done)
+
+    def test_failures(self):
+        anonymous = Upstream('vps', 'socks5://10.0.0.1')
+        with self.assertRaises(UpstreamError) as caught:
+            UpstreamHandshake(anonymous, '10.1.1.1', 80).feed(b'\x05\x02')
+        self.assertIsNone(caught.exception.rep)
+        handshake = UpstreamHandshake(Upstream('vps', 'socks5://al:pw@10.0.0.1'), '10.1.1.1', 80)
+        handshake.feed(b'\x05\x02')
+        with self.assertRaises(UpstreamError) as caught:
+            handshake.feed(b'\x01\x01')
+        self.assertIsNone(caught.exception.rep)
+        handshake = UpstreamHandshake(anonymous, '10.1.1.1', 80)
+        handshake.feed(b'\x05\x00')
+        with self.assertRaises(UpstreamError) as caught:
+            handshake.feed(b'\x05\x05\x00\x01' + bytes(6))
+        self.assertEqual(caught.exception.rep, 5)  # The target refused: pass that on to the client
+
+
+class HTTPHandshakeTest(unittest.TestCase):
+    def test_connect(self):
+        handshake = UpstreamHandshake(Upstream('web', 'http://al:pw@10.0.0.1'), '::1', 443)
+        request = handshake.start().decode()
+        self.assertTrue(request.startswith('CONNECT [::1]:443 HTTP/1.1\r\nHost: [::1]:443\r\n'))
+        self.assertIn('Proxy-Authorization: Basic YWw6cHc=\r\n', request)
+        self.assertTrue(request.endswith('\r\n\r\n'))
+        self.assertEqual(feed_all(handshake, b'HTTP/1.1 200 Connection established\r\n', b'Via: x\r\n\r\nSSH-2.0'), b'')
+        self.assertTrue(handshake.done)
+        self.assertEqual(handshake.leftover(), b'SSH-2.0')
+
+    def test_status_codes(self):
+        for status, rep in ((403, 2), (404, 4), (502, 5), (504, 4), (407, None), (500, None)):
+            handshake = UpstreamHandshake(Upstream('web', 'http://10.0.0.1'), 'example.com', 80)
+            with self.assertRaises(UpstreamError, msg=status) as caught:
+                handshake.feed(f'HTTP/1.1 {status} Nope\r\n\r\n'.encode())
+            self.assertEqual(caught.exception.rep, rep, status)
+
+    def test_malformed_responses(self):
+        with self.assertRaises(UpstreamError):
+            UpstreamHandshake(Upstream('web', 'http://10.0.0.1'), 'example.com', 80).feed(b'garbage\r\n\r\n')
+        handshake = UpstreamHandshake(Upstream('web', 'http://10.0.0.1'), 'example.com', 80)
+        with self.assertRaises(UpstreamError):
+            handshake.feed(b'HTTP/1.1 200 OK\r\n' + b'X: y\r\n' * 3000)
+
+
+class RouterTest(RulesFile):
+    def router(self, rules, default='vps,direct', previous=None):
+        return Router(self.upstreams, self.write(rules), default, previous)
+
+    def test_default_group_is_ranked_by_latency_to_the_destination(self):
+        router = self.router("")
+        paths, memory = router.plan('example.com', 443, 'u')
+        Router.succeeded(router.paths['vps'], memory, 0.5)
+        Router.succeeded(router.paths['direct'], memory, 0.05)
+        paths, _ = router.plan('example.com', 443, 'u')
+        self.assertEqual([path.name for path in paths], ['direct', 'vps'])
+        Router.failed(router.paths['direct'], memory)
+        paths, _ = router.plan('example.com', 443, 'u')
+        self.assertEqual([path.name for path in paths], ['vps', 'direct'])
+
+    def test_proxies_backing_off_go_last(self):
+        router = self.router("vps,backup .example.com\n")
+        _, memory = router.plan('www.example.com', 443, 'u')
+        for _ in range(Upstream.FAIL_LIMIT):
+            Router.failed(router.paths['vps'], memory)
+        paths, _ = router.plan('other.example.com', 443, 'u')
+        self.assertEqual([path.name for path in paths], ['backup', 'vps'])
+
+    def test_plan_waits_for_addresses_when_the_route_depends_on_them(self):
+        router = self.router("backup 10.0.0.0/8\n")
+        self.assertIsNone(router.plan('intranet', 80, 'u'))
+        paths, _ = router.plan('intranet', 80, 'u', [(V4, '10.0.0.7')])
+        self.assertEqual([path.name for path in paths], ['backup'])
+
+    def test_rebuilding_keeps_the_health_of_unchanged_upstreams(self):
+        router = self.router("")
+        router.paths['vps'].record(None)
+        self.upstreams = parse_upstreams('vps=socks5://10.9.9.9 backup=http://10.8.8.8:8080')
+        rebuilt = self.router("", previous=router)
+        self.assertIs(rebuilt.paths['vps'], router.paths['vps'])
+        self.assertIs(rebuilt.paths['direct'], router.paths['direct'])
+        self.assertIsNot(rebuilt.paths['backup'], router.paths['backup'])
+
+
+if __name__ == '__main__':
+    unittest.main()
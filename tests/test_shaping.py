@@ -0,0 +1,105 @@
+import os
+import time
+import unittest
+from unittest import mock
+
+from socks5_proxy import BandwidthShaper, SharedCounters, SOCKS5Server, TokenBucket, parse_rate, parse_size, throttle_delay
+
+
+class ParseTest(unittest.TestCase):
+    def test_sizes(self):
+        self.assertEqual(parse_size('512'), 512)
+        self.assertEqual(parse_size(' 64k '), 65536)
+        self.assertEqual(parse_size('1.5M'), 1572864)
+        self.assertEqual(parse_size('2G'), 2 << 30)
+        with self.assertRaises(ValueError):
+            parse_size('fast')
+
+    def test_rates(self):
+        self.assertIsNone(parse_rate(''))
+        self.assertIsNone(parse_rate('0'))
+        self.assertEqual(parse_rate('1M'), (1 << 20, 1 << 20))
+        self.assertEqual(parse_rate('1M:256K'), (1 << 20, 256 << 10))
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_debt_is_slept_off(self):
+        now = time.monotonic()
+        with mock.patch('time.monotonic', return_value=now):
+            bucket = TokenBucket(1000, 500)
+            self.assertEqual(bucket.reserve(500), 0.0)
+            self.assertAlmostEqual(bucket.reserve(250), 0.25)
+        with mock.patch('time.monotonic', return_value=now + 0.25):
+            self.assertEqual(bucket.reserve(0), 0.0)
+        with mock.patch('time.monotonic', return_value=now + 10):
+            self.assertAlmostEqual(bucket.reserve(600), 0.1)  # Refills up to the burst only
+
+    def test_the_slowest_bucket_decides(self):
+        now = time.monotonic()
+        with mock.patch('time.monotonic', return_value=now):
+            fast, slow = TokenBucket(10000, 100), TokenBucket(100, 100)
+            self.assertAlmostEqual(throttle_delay([fast, slow], 200), 1.0)
+            self.assertAlmostEqual(fast.tokens, -100)
+
+
+class ShaperTest(unittest.TestCase):
+    def test_buckets_per_tunnel_ip_user_and_global(self):
+        shaper = BandwidthShaper(global_up=(1000, 1000), conn_down=(100, 100), ip_up=(500, 500), user_down=(300, 300))
+        self.assertTrue(shaper.enabled)
+        a = shaper.open('10.0.0.2', 'alice')
+        b = shaper.open('10.0.0.2', 'bob')
+        self.assertEqual(len(a.up), 2)  # IP, global
+        self.assertEqual(a.up[0].offset, b.up[0].offset)  # Same client IP: one bucket
+        self.assertIs(a.up[1], shaper.global_up)
+        self.assertEqual(len(a.down), 2)  # User, tunnel
+        self.assertNotEqual(a.down[0].offset, b.down[0].offset)
+        self.assertEqual((a.up_chunk, a.down_chunk), (500, 100))
+        a.close()
+        self.assertIsNone(shaper.table.acquire('ip up', '10.0.0.2', limit=1))  # Still held by b
+        self.assertIsNotNone(shaper.table.acquire('user down', 'alice', limit=1))
+        b.close()
+        self.assertIsNotNone(shaper.table.acquire('ip up', '10.0.0.2', limit=1))
+
+    def test_no_limits(self):
+        shaper = BandwidthShaper()
+        self.assertFalse(shaper.enabled)
+        limits = shaper.open('10.0.0.2', None)
+        self.assertEqual((limits.up, limits.down, limits.up_chunk), ([], [], None))
+
+
+class SharedCountersTest(unittest.TestCase):
+    def test_holders_up_to_the_limit(self):
+        table = SharedCounters(64)
+        self.assertIsNotNone(table.acquire('connections', 'alice', limit=2))
+        self.assertIsNotNone(table.acquire('connections', 'alice', limit=2))
+        self.assertIsNone(table.acquire('connections', 'alice', limit=2))
+        self.assertIsNotNone(table.acquire('connections', 'bob', limit=2))
+        table.release('connections', 'alice')
+        self.assertIsNotNone(table.acquire('connections', 'alice', limit=2))
+        table.release('connections', 'carol')  # Never acquired: nothing to drop
+        self.assertIsNotNone(table.acquire('connections', 'carol', limit=1))
+
+    def test_buckets_are_shared_with_forked_workers(self):
+        shaper = BandwidthShaper(global_down=(1000, 1000), ip_down=(500, 500), table=SharedCounters(64, shared=True))
+        limits = shaper.open('10.0.0.2', 'alice')
+        pid = os.fork()
+        if pid == 0:
+            try:
+                throttle_delay(shaper.open('10.0.0.2', 'alice').down, 500)
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        self.assertAlmostEqual(throttle_delay(limits.down, 500), 1.0, delta=0.05)  # The IP bucket is empty
+
+    def test_user_limit_is_not_split_between_workers(self):
+        server = SOCKS5Server('127.0.0.1', 0, 'u', 'p', workers=4)
+        server.credentials.max_connections = lambda username: 2
+        self.assertTrue(server._acquire_user('alice'))
+        self.assertTrue(server._acquire_user('alice'))
+        self.assertFalse(server._acquire_user('alice'))
+        server._release_user('alice')
+        self.assertTrue(server._acquire_user('alice'))
+
+
+if __name__ == '__main__':
+    unittest.main()
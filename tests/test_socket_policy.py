@@ -0,0 +1,46 @@
+import socket
+import unittest
+
+from socks5_proxy import SocketPolicy
+
+NODELAY = (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+class SocketPolicyTest(unittest.TestCase):
+    def setUp(self):
+        self.policy = SocketPolicy(nodelay=0, keepalive='60:10:5', user_timeout=30000, buffer='64K',
+                                   bulk_buffer='1M', interactive_ports='22,5900-5901', bulk_ports='22,443')
+
+    def test_profiles_by_port(self):
+        self.assertEqual([self.policy.profile(port) for port in (22, 5901, 443, 80)],
+                         ['interactive', 'interactive', 'bulk', 'default'])  # Interactive wins over bulk
+
+    def test_changes_are_relative_to_the_default_profile(self):
+        self.assertEqual(self.policy.changes['default'], [])
+        self.assertEqual(self.policy.changes['interactive'], [NODELAY])
+        self.assertEqual(self.policy.changes['bulk'], [(socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 20),
+                                                       (socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)])
+        self.assertIn((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1), self.policy.options['bulk'])
+        self.assertNotIn(NODELAY, self.policy.options['default'])
+
+    def test_options_reach_the_socket(self):
+        sock = socket.socket()
+        try:
+            self.policy.tune(sock, 80)
+            self.assertEqual(sock.getsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE), 1)
+            self.assertEqual(sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY), 0)
+            if hasattr(socket, 'TCP_KEEPIDLE'):
+                self.assertEqual(sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE), 60)
+            self.policy.retune(sock, 22)
+            self.assertEqual(sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY), 1)
+        finally:
+            sock.close()
+
+    def test_nothing_configured(self):
+        policy = SocketPolicy(nodelay=0)
+        self.assertEqual(policy.options, {'default': [], 'interactive': [NODELAY], 'bulk': []})
+        self.assertEqual(policy.profile(22), 'default')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+import socks5_proxy
+from socks5_proxy import StartupTimer, is_proxy_process, wait_pid_exit
+
+
+class ProcessTest(unittest.TestCase):
+    def spawn(self, seconds, *argv):
+        """A child that sleeps for seconds once it is up, reaped as soon as it exits (like a process of
+        another parent would be)"""
+        code = f'import time; print(flush=True); time.sleep({seconds})'
+        process = subprocess.Popen([sys.executable, '-c', code, *argv], stdout=subprocess.PIPE)
+        process.stdout.readline()
+        reaper = threading.Thread(target=process.wait, daemon=True)
+        reaper.start()
+        self.addCleanup(process.stdout.close)
+        self.addCleanup(reaper.join)
+        self.addCleanup(process.kill)
+        return process
+
+    def test_wait_pid_exit(self):
+        for pidfd in (True, False):
+            with self.subTest(pidfd=pidfd), \
+                    mock.patch.object(socks5_proxy, '_pidfd_open',
+                                      socks5_proxy._pidfd_open if pidfd else mock.Mock(side_effect=OSError)):
+                quick, slow = self.spawn(0.1), self.spawn(30)
+                started = time.monotonic()
+                self.assertTrue(wait_pid_exit(quick.pid, 5))
+                self.assertLess(time.monotonic() - started, 2)
+                quick.wait()  # Reaped
+                self.assertTrue(wait_pid_exit(quick.pid, 5))  # Already gone
+                self.assertFalse(wait_pid_exit(slow.pid, 0.1))
+
+    def test_is_proxy_process(self):
+        self.assertTrue(is_proxy_process(self.spawn(30, 'socks5_proxy.py').pid))
+        self.assertFalse(is_proxy_process(self.spawn(30, 'other.py').pid))
+        gone = self.spawn(0)
+        gone.wait()  # Reaped
+        self.assertFalse(is_proxy_process(gone.pid))
+
+
+class StartupTimerTest(unittest.TestCase):
+    def test_summary(self):
+        with mock.patch.object(StartupTimer, '_process_age', return_value=0.12), \
+                mock.patch('time.monotonic', side_effect=[10.0, 10.005, 10.025]):
+            timer = StartupTimer()
+            timer.mark('config')
+            timer.mark('listen')
+        self.assertEqual(timer.summary(), 'python+imports 120ms, config 5ms, listen 20ms (total 145ms)')
+
+    def test_process_age(self):
+        age = StartupTimer._process_age()
+        if age is None:
+            self.skipTest('no /proc')
+        self.assertGreater(age, 0)
+        self.assertLess(age, 3600)
+
+
+if __name__ == '__main__':
+    unittest.main()
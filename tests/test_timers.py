@@ -0,0 +1,112 @@
+import socket
+import time
+import unittest
+from unittest import mock
+
+from socks5_proxy import Tunnel, TunnelTimers
+
+
+class TunnelTimersTest(unittest.TestCase):
+    def setUp(self):
+        self.now = float(int(time.monotonic()))
+        self.sockets = []
+        self.far = {}  # Tunnel -> far end of its socket
+
+    def tearDown(self):
+        for sock in self.sockets:
+            sock.close()
+
+    def at(self, offset):
+        return mock.patch('time.monotonic', return_value=self.now + offset)
+
+    def tunnel(self, timers, directions=2):
+        """A relaying tunnel on the wheel; its far socket reads EOF once the wheel cuts it"""
+        near, far = socket.socketpair()
+        far.setblocking(False)
+        self.sockets += [near, far]
+        tunnel = Tunnel('10.0.0.2', 'u', 'example.com', 443)
+        tunnel.sockets = (near,)
+        timers.add(tunnel, directions)
+        self.far[tunnel] = far
+        return tunnel
+
+    def cut(self, tunnel):
+        try:
+            return self.far[tunnel].recv(1) == b''
+        except BlockingIOError:
+            return False
+
+    def test_idle_tunnels_are_cut_and_traffic_postpones_the_deadline(self):
+        with self.at(0):
+            timers = TunnelTimers(idle_timeout=10)
+            idle, busy = self.tunnel(timers), self.tunnel(timers)
+        with self.at(5):
+            busy.count(True, 100)
+            self.assertEqual(timers.tick(), [])
+            self.assertIsNone(timers.tick())  # Same second
+        with self.at(11):
+            self.assertEqual(timers.tick(), [(idle, 'idle')])
+        self.assertTrue(self.cut(idle))
+        self.assertFalse(self.cut(busy))
+        self.assertEqual((len(timers), idle.slot), (1, -1))
+        with self.at(16):
+            self.assertEqual(timers.tick(), [(busy, 'idle')])
+        self.assertEqual(len(timers), 0)
+
+    def test_lifetime_limit(self):
+        with self.at(0):
+            timers = TunnelTimers(idle_timeout=0, max_lifetime=30)
+            tunnel = self.tunnel(timers)
+        with self.at(29):
+            tunnel.count(False, 1)
+            self.assertEqual(timers.tick(), [])
+        with self.at(31):
+            self.assertEqual(timers.tick(), [(tunnel, 'lifetime')])
+
+    def test_deadlines_past_one_turn_are_refiled(self):
+        with self.at(0):
+            timers = TunnelTimers(idle_timeout=TunnelTimers.SLOTS * 2 + 5)
+            tunnel = self.tunnel(timers)
+        for second in range(100, TunnelTimers.SLOTS * 2 + 5, 100):
+            with self.at(second):
+                self.assertEqual(timers.tick(), [])
+        with self.at(TunnelTimers.SLOTS * 2 + 7):
+            self.assertEqual(timers.tick(), [(tunnel, 'idle')])
+
+    def test_no_limits_keep_tunnels_on_the_wheel(self):
+        with self.at(0):
+            timers = TunnelTimers(idle_timeout=0)
+            tunnel = self.tunnel(timers)
+        with self.at(TunnelTimers.SLOTS * 3):
+            self.assertEqual(timers.tick(), [])
+        self.assertEqual(len(timers), 1)
+        self.assertEqual(timers.cut_all(), 1)
+        self.assertTrue(self.cut(tunnel))
+
+    def test_the_last_direction_to_finish_cleans_up(self):
+        with self.at(0):
+            timers = TunnelTimers(idle_timeout=10)
+            tunnel = self.tunnel(timers, directions=2)
+        self.assertFalse(timers.finish(tunnel))
+        self.assertEqual(len(timers), 1)
+        self.assertTrue(timers.finish(tunnel))
+        self.assertEqual((len(timers), tunnel.slot), (0, -1))
+        with self.at(20):
+            self.assertEqual(timers.tick(), [])
+
+    def test_evict_longest_idle_first(self):
+        with self.at(0):
+            timers = TunnelTimers(idle_timeout=300)
+            tunnels = [self.tunnel(timers) for _ in range(4)]
+        for i, tunnel in enumerate(tunnels):
+            with self.at(10 * (i + 1)):
+                tunnel.count(True, 1)  # Last active at 10, 20, 30, 40
+        with self.at(45):
+            self.assertEqual(timers.evict(2, min_idle=20), [tunnels[0], tunnels[1]])
+            self.assertEqual(timers.evict(5, min_idle=10), [tunnels[2]])
+        self.assertEqual([self.cut(tunnel) for tunnel in tunnels], [True, True, True, False])
+        self.assertEqual(len(timers), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import time
+import unittest
+from unittest import mock
+
+import socks5_proxy
+from socks5_proxy import BufferPool, Metrics, SOCKS5Server, Tunnel
+
+
+class TunnelTest(unittest.TestCase):
+    def test_relay_state_starts_unset(self):
+        tunnel = Tunnel('10.0.0.2', 'u', 'example.com', 443)
+        self.assertFalse(hasattr(tunnel, '__dict__'))
+        self.assertEqual((tunnel.limits, tunnel.sockets, tunnel.running, tunnel.opened, tunnel.slot),
+                         (None, None, 0, 0.0, -1))
+        self.assertEqual(tunnel.shaping(True), ((), None))
+        tunnel.slot = 7
+        tunnel.running += 2
+        self.assertEqual((tunnel.slot, tunnel.running), (7, 2))
+        self.assertEqual(Tunnel('10.0.0.3', 'u', 'example.com', 443).slot, -1)
+        with self.assertRaises(AttributeError):
+            tunnel.missing
+        with self.assertRaises(AttributeError):
+            tunnel.missing = 1
+
+    def test_count(self):
+        tunnel = Tunnel('10.0.0.2', 'u', 'example.com', 443)
+        tunnel.count(True, 10)
+        tunnel.count(False, 25)
+        self.assertEqual((tunnel.bytes_up, tunnel.bytes_down), (10, 25))
+
+
+class BufferPoolTest(unittest.TestCase):
+    def test_busy_and_idle_bytes(self):
+        pool = BufferPool(1024, 4096, max_idle_bytes=2048)
+        small, large = pool.acquire(), pool.acquire(4096)
+        self.assertEqual((len(small), len(large), pool.busy_bytes), (1024, 4096, 5120))
+        grown = pool.grow(small)
+        self.assertEqual((len(grown), pool.busy_bytes, pool.idle_bytes), (2048, 6144, 1024))
+        self.assertIs(pool.grow(large), large)
+        pool.release(large)  # Over max_idle_bytes: dropped
+        pool.release(grown)
+        self.assertEqual((pool.busy_bytes, pool.idle_bytes), (0, 1024))
+        self.assertIs(pool.acquire(1024).obj, small.obj)
+
+
+class MemoryGaugesTest(unittest.TestCase):
+    def setUp(self):
+        self.server = SOCKS5Server('127.0.0.1', 0, 'u', 'p')
+
+    def gauges(self, rss):
+        with mock.patch.object(socks5_proxy, 'resident_bytes', return_value=rss):
+            return {name: value for name, (_, value) in self.server._memory_gauges().items()}
+
+    def test_per_tunnel_memory(self):
+        self.assertEqual(self.gauges(10_000_000)['memory_baseline_bytes'], 10_000_000)
+        tunnels = [Tunnel('10.0.0.2', 'u', 'example.com', 443) for _ in range(4)]
+        for tunnel in tunnels:
+            self.server.metrics.open_tunnel(tunnel)
+        tunnels[0].last_active = tunnels[1].last_active = time.monotonic() - Metrics.ACTIVE_WINDOW - 1
+        buffers = [self.server.buffer_pool.acquire(16384) for _ in range(2)]
+        gauges = self.gauges(10_000_000 + 4 * 20_000 + 32768)
+        self.assertEqual((gauges['open_tunnels_active'], gauges['open_tunnels_idle']), (2, 2))
+        self.assertEqual(gauges['memory_baseline_bytes'], 10_000_000)
+        self.assertEqual(gauges['buffer_pool_busy_bytes'], 32768)
+        self.assertEqual(gauges['memory_per_idle_tunnel_bytes'], 20_000)
+        self.assertEqual(gauges['memory_per_active_tunnel_bytes'], 20_000 + 16384)
+        for buf in buffers:
+            self.server.buffer_pool.release(buf)
+        for tunnel in tunnels:
+            self.server.metrics.close_tunnel(tunnel)
+        gauges = self.gauges(12_000_000)
+        self.assertEqual(gauges['memory_baseline_bytes'], 12_000_000)
+        self.assertEqual(gauges['memory_per_idle_tunnel_bytes'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
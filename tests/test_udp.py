@@ -0,0 +1,132 @@
+import socket
+import threading
+import unittest
+from unittest import mock
+
+from socks5_proxy import (BindPool, DestinationACL, DNSResolver, Metrics, Reactor, Tunnel, UDPAssociation,
+                          build_udp_header, parse_udp_header)
+
+
+class HeaderTest(unittest.TestCase):
+    def test_round_trip(self):
+        for ip in ('192.0.2.1', '2001:db8::1'):
+            header = build_udp_header(ip, 53)
+            self.assertEqual(parse_udp_header(header + b'payload'), (0, ip, 53, len(header)))
+
+    def test_domain_and_fragments(self):
+        datagram = b'\x00\x00\x01\x03\x0bexample.com\x00\x35query'
+        self.assertEqual(parse_udp_header(datagram), (1, 'example.com', 53, 18))
+
+    def test_malformed(self):
+        for datagram in (b'\x00\x00', b'\x00\x00\x00\x03', b'\x00\x00\x00\x01\x7f\x00\x00\x01\x00',
+                         b'\x00\x00\x00\x05' + bytes(6), b'\x00\x00\x00\x03\x0bexample'):
+            self.assertIsNone(parse_udp_header(datagram), datagram)
+
+
+class ReactorTest(unittest.TestCase):
+    def setUp(self):
+        self.acl = DestinationACL('')
+        self.reactor = Reactor(DNSResolver(), Metrics(), 60, BindPool(4), self.acl)
+        self.target = self.udp_socket()
+        self.target_port = self.target.getsockname()[1]
+        self.sockets = [self.target]
+
+    def tearDown(self):
+        for sock in self.sockets:
+            sock.close()
+
+    def udp_socket(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(('127.0.0.1', 0))
+        sock.settimeout(2)
+        return sock
+
+    def associate(self):
+        """(client socket, relay address, closed Event) of a new association served by the reactor"""
+        relay, client = self.udp_socket(), self.udp_socket()
+        relay.setblocking(False)  # As _open_udp_association leaves it
+        control, control_far = socket.socketpair()
+        self.sockets += [relay, client, control, control_far]
+        closed = threading.Event()
+        tunnel = Tunnel('127.0.0.1', 'u', 'udp', relay.getsockname()[1], 3)
+        self.reactor.add(UDPAssociation(control, relay, False, '127.0.0.1', client.getsockname()[1],
+                                        relay.getsockname(), tunnel, closed.set))
+        return client, relay.getsockname(), closed
+
+    def test_handler_failure_closes_only_its_association(self):
+        check = self.acl.check
+
+        def failing_check(host, port, user):
+            if port == 666:
+                raise RuntimeError("boom")
+            return check(host, port, user)
+        self.acl.check = failing_check
+        broken_client, broken_relay, broken_closed = self.associate()
+        client, relay, closed = self.associate()
+
+        broken_client.sendto(build_udp_header('127.0.0.1', 666) + b'x', broken_relay)
+        self.assertTrue(broken_closed.wait(2))
+
+        client.sendto(build_udp_header('127.0.0.1', self.target_port) + b'ping', relay)
+        data, source = self.target.recvfrom(100)
+        self.assertEqual(data, b'ping')
+        self.target.sendto(b'pong', source)
+        reply, _ = client.recvfrom(100)
+        self.assertEqual(reply[parse_udp_header(reply)[3]:], b'pong')
+        self.assertFalse(closed.is_set())
+
+    def reply_from(self, sender, client, relay):
+        """What the client receives after sender answers a datagram sent to the target (None if dropped)"""
+        client.sendto(build_udp_header('127.0.0.1', self.target_port) + b'ping', relay)
+        _, source = self.target.recvfrom(100)
+        sender.sendto(b'pong', source)
+        client.settimeout(0.5)
+        try:
+            reply, _ = client.recvfrom(100)
+        except socket.timeout:
+            return None
+        return parse_udp_header(reply)[1:3]
+
+    def test_replies_only_from_contacted_destinations(self):
+        client, relay, _ = self.associate()
+        self.assertEqual(self.reply_from(self.target, client, relay), ('127.0.0.1', self.target_port))
+        stranger = self.udp_socket()
+        self.sockets.append(stranger)
+        self.assertIsNone(self.reply_from(stranger, client, relay))
+
+    def test_full_cone_accepts_any_source_the_acl_allows(self):
+        self.reactor.full_cone = True
+        client, relay, _ = self.associate()
+        stranger = self.udp_socket()
+        self.sockets.append(stranger)
+        self.assertEqual(self.reply_from(stranger, client, relay), ('127.0.0.1', stranger.getsockname()[1]))
+        self.acl.allows_address = lambda ip, port, user: port != stranger.getsockname()[1]
+        self.assertIsNone(self.reply_from(stranger, client, relay))
+
+    def test_names_resolved_on_the_pool_are_sent_from_the_reactor_thread(self):
+        self.reactor.resolver.resolve_cached = lambda host: None
+        self.reactor.resolver.resolve = lambda host: [(socket.AF_INET, '127.0.0.1')]
+        threads = []
+        remember = UDPAssociation.remember
+
+        def recording_remember(association, ip, port):
+            threads.append(threading.current_thread().name)
+            remember(association, ip, port)
+
+        client, relay, _ = self.associate()
+        with mock.patch.object(UDPAssociation, 'remember', recording_remember):
+            client.sendto(b'\x00\x00\x00\x03\x0bexample.com' + self.target_port.to_bytes(2, 'big') + b'ping', relay)
+            self.assertEqual(self.target.recvfrom(100)[0], b'ping')
+        self.assertEqual(threads, ['reactor'])
+
+    def test_remembered_destinations_are_bounded(self):
+        association = UDPAssociation(None, None, False, '127.0.0.1', None, None, None, None)
+        for port in range(UDPAssociation.MAX_PEERS + 10):
+            association.remember('10.0.0.1', port)
+        self.assertEqual(len(association.peers), UDPAssociation.MAX_PEERS)
+        self.assertNotIn(('10.0.0.1', 0), association.peers)
+        self.assertIn(('10.0.0.1', UDPAssociation.MAX_PEERS + 9), association.peers)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import socket
+import time
+import unittest
+
+from socks5_proxy import DNSResolver, WarmPool
+
+
+class WarmPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.listener = socket.socket()
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(16)
+        self.listener.settimeout(2)
+        self.port = self.listener.getsockname()[1]
+        self.pool = WarmPool(DNSResolver(), destinations=1, per_dest=2, ttl=20, min_hits=3)
+        self.pool.TICK = 0.02
+
+    def tearDown(self):
+        self.pool.stop()
+        self.listener.close()
+
+    def spares(self, count):
+        deadline = time.monotonic() + 5
+        while len(self.pool.idle.get(('127.0.0.1', self.port), ())) < count:
+            self.assertLess(time.monotonic(), deadline, "no spare connections")
+            time.sleep(0.01)
+
+    def test_only_hot_destinations_are_warmed(self):
+        for _ in range(2):
+            self.pool.record('127.0.0.1', self.port)
+        for _ in range(5):
+            self.pool.record('127.0.0.1', 1)
+        self.assertEqual(self.pool._hot(), [('127.0.0.1', 1)])  # destinations=1 keeps the hottest
+        self.pool.destinations = 2
+        self.assertEqual(self.pool._hot(), [('127.0.0.1', 1)])  # Below min_hits
+        self.pool.record('127.0.0.1', self.port)
+        self.assertEqual(self.pool._hot(), [('127.0.0.1', 1), ('127.0.0.1', self.port)])
+
+    def test_take_hands_out_healthy_spares(self):
+        for _ in range(3):
+            self.pool.record('127.0.0.1', self.port)
+        self.pool.start()
+        self.spares(2)
+        self.pool.running = False  # No refills from here on
+        peers = [self.listener.accept()[0] for _ in range(2)]
+        peers[0].close()  # The first spare's peer went away while it sat idle
+        time.sleep(0.05)
+        sock = self.pool.take('127.0.0.1', self.port)
+        self.assertIsNotNone(sock)
+        sock.sendall(b'ping')
+        self.assertEqual(peers[1].recv(4), b'ping')
+        sock.close()
+        peers[1].close()
+        self.assertIsNone(self.pool.take('127.0.0.1', self.port))
+        self.assertEqual((self.pool.hits, self.pool.misses), (1, 1))
+        self.assertIsNone(self.pool.take('127.0.0.1', 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import os
+import unittest
+
+from socks5_proxy import WorkerStats
+
+
+class WorkerStatsTest(unittest.TestCase):
+    def test_master_sees_what_each_worker_publishes(self):
+        stats = WorkerStats(3)
+        self.assertEqual(stats.totals(), (0, 0, 0))
+        children = []
+        for worker_id in range(3):
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    stats.publish(worker_id, worker_id + 1, 10 * (worker_id + 1), worker_id)
+                finally:
+                    os._exit(0)
+            children.append(pid)
+        for pid in children:
+            os.waitpid(pid, 0)
+        self.assertEqual(stats.read(1), (2, 20, 1))
+        self.assertEqual(stats.totals(), (6, 60, 3))
+        stats.publish(1, 0, 25, 1)  # A worker's later figures replace its earlier ones
+        self.assertEqual(stats.totals(), (4, 65, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()